@@ -33,6 +33,7 @@ ccsm2_t42 = []
 ccsm3_t42 = []
 ccsm3_t85 = []
 
+random.seed(1)
 for i in range(12):
     obs.append(random.uniform(0.4, 1.2))
     ccsm2_t42.append(random.uniform(0.4, 1.2))
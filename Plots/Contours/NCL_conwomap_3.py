@@ -30,7 +30,8 @@ xlist = np.linspace(0, 31.0, 31)
 ylist = np.linspace(0, 31.0, 31)
 xdata, ydata = np.meshgrid(xlist, ylist)
 
-zdata = np.random.normal(0, 3.0, size=(31, 31))
+random = np.random.default_rng(seed=1)
+zdata = random.normal(0, 3.0, size=(31, 31))
 
 ###############################################################################
 # Create figure
@@ -17,12 +17,15 @@ See following URLs to see the reproduced NCL plot & script:
 
 import numpy as np
 import xarray as xr
+import matplotlib.colors as colors
 import matplotlib.pyplot as plt
 
 import geocat.datafiles as gdf
 from geocat.viz import cmaps as gvcmaps
 from geocat.viz import util as gvutil
 
+from gallery_tools.radar import plot_sweep
+
 ##############################################################################
 # Read in data:
 
@@ -35,42 +38,40 @@ ds = xr.open_dataset(gdf.get("netcdf_files/dz.nc"), decode_times=False)
 xcenter = 0.0
 ycenter = 0.0
 
-# construct radial array from netcdf metadata
+# Distance between the gates of every ray, from the netcdf metadata
 km_between_cells = 0.25
-radius = ds.DZ.data.shape[1] * km_between_cells
-r = np.arange(0, radius, 0.25)
 
 # Convert reflectivity factor
 values = ds.DZ.data
 values = values * 100
 
-# Make angles monotonic
-theta = ds.Azimuth.data
-theta[0:63] = theta[0:63] - 360
-
-# Make a cartesian mesh grid
-radius_matrix, theta_matrix = np.meshgrid(r, theta)
-X = radius_matrix * np.cos(np.deg2rad(theta_matrix))
-Y = radius_matrix * np.sin(np.deg2rad(theta_matrix))
+# Contour levels of the plot. Like contourf, leave the cells outside of them
+# blank
+levels = np.arange(-20, 70, 5) * 100
+values = np.ma.masked_outside(values, levels[0], levels[-1])
 
 ##############################################################################
 # Plotting helper function
 
 
-def radar_plot(X, Y, values, bg_color=None):
+def radar_plot(values, bg_color=None):
     # Create a figure and axes using subplots
     fig, ax = plt.subplots(figsize=(6, 8))
 
     # Choose default colormap
     cmap = gvcmaps.gui_default
 
-    # Plot using contourf
-    p = plt.contourf(X,
-                     Y,
-                     values,
-                     cmap=cmap,
-                     levels=np.arange(-20, 70, 5) * 100,
-                     zorder=3)
+    # Plot every cell of the sweep with pcolormesh, colored by contour level.
+    # The cartesian mesh of the sweep geometry is computed once and reused by
+    # both plots, and the azimuths, which wrap around north, are made
+    # monotonic on a copy rather than in ds.Azimuth
+    p = plot_sweep(ax,
+                   ds.Azimuth,
+                   km_between_cells,
+                   values,
+                   cmap=cmap,
+                   norm=colors.BoundaryNorm(levels, cmap.N),
+                   zorder=3)
 
     # Change orientation and tick marks of colorbar
     plt.colorbar(p,
@@ -120,10 +121,10 @@ def radar_plot(X, Y, values, bg_color=None):
 # Plot:
 
 # Generate first plot without a background using the helper function
-radar_plot(X, Y, values)
+radar_plot(values)
 
 ##############################################################################
 # Alternative plot:
 
 # Generate alternative plot with a background
-radar_plot(X, Y, values, bg_color="lightgrey")
+radar_plot(values, bg_color="lightgrey")
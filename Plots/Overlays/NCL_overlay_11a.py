@@ -45,12 +45,14 @@ from matplotlib import pyplot as plt
 
 from cartopy.feature import ShapelyFeature, OCEAN, LAKES, LAND
 from cartopy.crs import PlateCarree
-from cartopy.io.shapereader import Reader as ShapeReader, natural_earth
 
 import geocat.datafiles as gdf
 from geocat.viz import cmaps as gvcmaps
 from geocat.viz import util as gvutil
 
+from gallery_tools.masks import grid_mask
+from gallery_tools.natural_earth import projected_geometries
+
 ###############################################################################
 # Read in data:
 # -------------
@@ -77,24 +79,29 @@ lon = ds["lon"]
 # and Taiwan, the borders of Chinese provinces, and all land borders *without*
 # China or Taiwan.
 
-# Download the Natural Earth shapefile for country boundaries at 10m resolution
-shapefile = natural_earth(category='cultural',
-                          resolution='10m',
-                          name='admin_0_countries')
-
-# Sort the geometries in the shapefile into Chinese/Taiwanese or other
-country_geos = []
-other_land_geos = []
-for record in ShapeReader(shapefile).records():
-    if record.attributes['ADMIN'] in ['China', 'Taiwan']:
-        country_geos.append(record.geometry)
-    else:
-        other_land_geos.append(record.geometry)
-
 # Define map projection to allow Cartopy to transform ``lat`` and ``lon`` values accurately into points on the
 # matplotlib plot canvas.
 projection = PlateCarree()
 
+# Longitude and latitude extent of the map
+extent = [100, 145, 15, 55]
+
+# Get the geometries of the Natural Earth shapefile for country boundaries at
+# 10m resolution, already clipped to the map and projected. They are computed
+# from the shapefile on the first run only and read from a cache afterwards.
+geos, records = projected_geometries('cultural',
+                                     'admin_0_countries',
+                                     '10m',
+                                     projection,
+                                     extent=extent,
+                                     fields=['ADMIN'])
+
+# Sort the geometries in the shapefile into Chinese/Taiwanese or other
+is_china = np.array(
+    [record['ADMIN'] in ['China', 'Taiwan'] for record in records], dtype=bool)
+country_geos = list(geos[is_china])
+other_land_geos = list(geos[~is_china])
+
 # Define a Cartopy Feature for the country borders and the land mask (i.e.,
 # all other land) from the shapefile geometries, so they can be easily plotted
 countries = ShapelyFeature(country_geos,
@@ -107,16 +114,18 @@ land_mask = ShapelyFeature(other_land_geos,
                            facecolor='white',
                            edgecolor='none')
 
-# Download the Natural Earth shapefile for the states/provinces at 10m resolution
-shapefile = natural_earth(category='cultural',
-                          resolution='10m',
-                          name='admin_1_states_provinces')
+# Get the geometries of the Natural Earth shapefile for the states/provinces
+# at 10m resolution, the same way
+geos, records = projected_geometries('cultural',
+                                     'admin_1_states_provinces',
+                                     '10m',
+                                     projection,
+                                     extent=extent,
+                                     fields=['admin'])
 
 # Extract the Chinese province borders
 province_geos = [
-    record.geometry
-    for record in ShapeReader(shapefile).records()
-    if record.attributes['admin'] == 'China'
+    geo for geo, record in zip(geos, records) if record['admin'] == 'China'
 ]
 
 # Define a Cartopy Feature for the province borders, so they can be easily plotted
@@ -134,7 +143,7 @@ provinces = ShapelyFeature(province_geos,
 fig = plt.figure(figsize=(10, 10))
 ax = plt.axes(projection=projection)
 
-ax.set_extent([100, 145, 15, 55], crs=projection)
+ax.set_extent(extent, crs=projection)
 
 # Define the contour levels
 clevs = np.arange(228, 273, 4, dtype=float)
@@ -145,6 +154,16 @@ newcmp = gvutil.truncate_colormap(gvcmaps.BkBlAqGrYeOrReViWh200,
                                   maxval=0.6,
                                   n=len(clevs))
 
+# Set to True to mask the temperature field on its grid to the countries
+# before contouring, rather than only covering the contours outside of them.
+# The grid points outside of the countries are set to missing, which costs no
+# more than an unmasked plot, but the contours then end on grid cells (hidden
+# by the features drawn on top where they do not match the boundaries).
+rasterized_mask = False
+if rasterized_mask:
+    # Compute (or read from a cache) the grid points inside the countries
+    T = T.where(grid_mask(country_geos, lon, lat))
+
 # Draw the temperature contour plot with the subselected colormap
 # (Place the zorder of the contour plot at the lowest level)
 cf = ax.contourf(lon, lat, T, levels=clevs, cmap=newcmp, zorder=1)
@@ -43,16 +43,19 @@ import numpy as np
 
 from matplotlib import pyplot as plt
 from matplotlib.patches import PathPatch
+from matplotlib.path import Path
 
 from cartopy.feature import ShapelyFeature, OCEAN, LAKES, LAND
 from cartopy.crs import PlateCarree
 from cartopy.mpl.patch import geos_to_path
-from cartopy.io.shapereader import Reader as ShapeReader, natural_earth
 
 import geocat.datafiles as gdf
 from geocat.viz import cmaps as gvcmaps
 from geocat.viz import util as gvutil
 
+from gallery_tools.masks import grid_mask
+from gallery_tools.natural_earth import projected_geometries
+
 ###############################################################################
 # Read in data:
 # --------------------------
@@ -79,24 +82,29 @@ lon = ds["lon"]
 # and Taiwan, the borders of Chinese provinces, and all land borders *without*
 # China or Taiwan.
 
-# Download the Natural Earth shapefile for country boundaries at 10m resolution
-shapefile = natural_earth(category='cultural',
-                          resolution='10m',
-                          name='admin_0_countries')
-
-# Sort the geometries in the shapefile into Chinese/Taiwanese or other
-country_geos = []
-other_land_geos = []
-for record in ShapeReader(shapefile).records():
-    if record.attributes['ADMIN'] in ['China', 'Taiwan']:
-        country_geos.append(record.geometry)
-    else:
-        other_land_geos.append(record.geometry)
-
 # Define map projection to allow Cartopy to transform ``lat`` and ``lon`` values accurately into points on the
 # matplotlib plot canvas.
 projection = PlateCarree()
 
+# Longitude and latitude extent of the map
+extent = [100, 145, 15, 55]
+
+# Get the geometries of the Natural Earth shapefile for country boundaries at
+# 10m resolution, already clipped to the map and projected. They are computed
+# from the shapefile on the first run only and read from a cache afterwards.
+geos, records = projected_geometries('cultural',
+                                     'admin_0_countries',
+                                     '10m',
+                                     projection,
+                                     extent=extent,
+                                     fields=['ADMIN'])
+
+# Sort the geometries in the shapefile into Chinese/Taiwanese or other
+is_china = np.array(
+    [record['ADMIN'] in ['China', 'Taiwan'] for record in records], dtype=bool)
+country_geos = list(geos[is_china])
+other_land_geos = list(geos[~is_china])
+
 # Define a Cartopy Feature for the country borders and the land mask (i.e.,
 # all other land) from the shapefile geometries, so they can be easily plotted
 countries = ShapelyFeature(country_geos,
@@ -109,16 +117,18 @@ land_mask = ShapelyFeature(other_land_geos,
                            facecolor='white',
                            edgecolor='none')
 
-# Download the Natural Earth shapefile for the states/provinces at 10m resolution
-shapefile = natural_earth(category='cultural',
-                          resolution='10m',
-                          name='admin_1_states_provinces')
+# Get the geometries of the Natural Earth shapefile for the states/provinces
+# at 10m resolution, the same way
+geos, records = projected_geometries('cultural',
+                                     'admin_1_states_provinces',
+                                     '10m',
+                                     projection,
+                                     extent=extent,
+                                     fields=['admin'])
 
 # Extract the Chinese province borders
 province_geos = [
-    record.geometry
-    for record in ShapeReader(shapefile).records()
-    if record.attributes['admin'] == 'China'
+    geo for geo, record in zip(geos, records) if record['admin'] == 'China'
 ]
 
 # Define a Cartopy Feature for the province borders, so they can be easily plotted
@@ -136,7 +146,7 @@ provinces = ShapelyFeature(province_geos,
 fig = plt.figure(figsize=(10, 10))
 ax = plt.axes(projection=projection)
 
-ax.set_extent([100, 145, 15, 55], crs=projection)
+ax.set_extent(extent, crs=projection)
 
 # Draw the ocean and lake features
 ax.add_feature(OCEAN.with_scale('50m'), edgecolor='black', lw=1)
@@ -151,14 +161,30 @@ newcmp = gvutil.truncate_colormap(gvcmaps.BkBlAqGrYeOrReViWh200,
                                   maxval=0.6,
                                   n=len(clevs))
 
-# Draw the contour plot, "clipped" to the country boundaries
-# (NOTE: There are multiple closed polygons representing the boundaries of the
-#        countries.  This is both because there are 2 country borders being used
-#        to clip the contour plot, but also because China consists of many islands.
-#        As a result, we have to loop over *all closed paths* and construct a
-#        matplotlib patch object that we can use the clip the contour plot.)
-for path in geos_to_path(country_geos):
-    patch = PathPatch(path,
+# Set to True to mask the temperature field on its grid instead of clipping
+# the contour plot to the country boundaries. The grid points outside of the
+# countries are set to missing before contouring, which costs no more than
+# an unmasked plot, but the contours then end on grid cells rather than on
+# the boundaries (see the introduction above).
+rasterized_mask = False
+
+if rasterized_mask:
+    # Compute (or read from a cache) the grid points inside the countries and
+    # contour the masked field
+    inside = grid_mask(country_geos, lon, lat)
+    cf = ax.contourf(lon, lat, T.where(inside), levels=clevs, cmap=newcmp)
+
+    # Draw the country borders
+    ax.add_feature(countries)
+else:
+    # Draw the contour plot, "clipped" to the country boundaries
+    # (NOTE: There are multiple closed polygons representing the boundaries of the
+    #        countries.  This is both because there are 2 country borders being used
+    #        to clip the contour plot, but also because China consists of many islands.
+    #        All closed paths are combined into one compound path, so that a
+    #        single patch, and a single contour plot clipped by it, covers
+    #        them all.)
+    patch = PathPatch(Path.make_compound_path(*geos_to_path(country_geos)),
                       transform=ax.transData,
                       facecolor='none',
                       edgecolor='black',
@@ -168,13 +194,6 @@ for path in geos_to_path(country_geos):
     ax.add_patch(patch)
 
     # Draw the contour plot
-    # (NOTE: Because this line is in the loop over closed paths, the contour plot
-    #        is being drawn for each closed path.  This has to be done because
-    #        matplotlib cannot apply *multiple* closed paths at the same time to
-    #        to the same plot.  Hence, for each closed path, we need to generate
-    #        another contour plot and clip that contour plot with the patch.  In
-    #        other words, every island on this plot corresponds to its own
-    #        contour plot!)
     cf = ax.contourf(lon, lat, T, levels=clevs, cmap=newcmp)
 
     # Clip each contour of the contour plot
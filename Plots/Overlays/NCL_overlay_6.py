@@ -42,27 +42,27 @@ import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 import matplotlib.colors as mcolors
 
-import geocat.datafiles as gdf
 from geocat.viz import cmaps as gvcmaps
 
+from gallery_tools.storm import open_storm
+from gallery_tools.streamlines import streamline_arrows
+
 ###############################################################################
 # Read in data:
 
-# Open a netCDF data file using xarray default engine and load the data into xarrays
-uf = xr.open_dataset(gdf.get("netcdf_files/Ustorm.cdf"))
-vf = xr.open_dataset(gdf.get("netcdf_files/Vstorm.cdf"))
-pf = xr.open_dataset(gdf.get("netcdf_files/Pstorm.cdf"))
-tf = xr.open_dataset(gdf.get("netcdf_files/Tstorm.cdf"))
-u500f = xr.open_dataset(gdf.get("netcdf_files/U500storm.cdf"))
-v500f = xr.open_dataset(gdf.get("netcdf_files/V500storm.cdf"))
-
-p = pf.p.isel(timestep=0).drop('timestep')
-t = tf.t.isel(timestep=0).drop('timestep')
-u = uf.u.isel(timestep=0).drop('timestep')
-v = vf.v.isel(timestep=0).drop('timestep')
-u500 = u500f.u.isel(timestep=0).drop('timestep')
-v500 = v500f.v.isel(timestep=0).drop('timestep')
-time = vf.timestep
+# Open the netCDF data files of all variables concurrently and combine them
+# into one dataset. Data is only read when it is used, so selecting the first
+# timestep only reads that part of each file.
+storm = open_storm()
+step = storm.isel(timestep=0).drop_vars('timestep')
+
+p = step.p
+t = step.t
+u = step.u
+v = step.v
+u500 = step.u500
+v500 = step.v500
+time = storm.timestep
 
 # Convert Pa to hPa
 p = p / 100
@@ -156,16 +156,10 @@ with np.errstate(
                             density=2,
                             zorder=5)
 
-# Divide streamlines into segments
-seg = streams.lines.get_segments()
-# Determine how many arrows on each streamline, the placement, and angles of the arrows
-period = 7
-arrow_x = np.array([seg[i][0, 0] for i in range(0, len(seg), period)])
-arrow_y = np.array([seg[i][0, 1] for i in range(0, len(seg), period)])
-arrow_dx = np.array(
-    [seg[i][1, 0] - seg[i][0, 0] for i in range(0, len(seg), period)])
-arrow_dy = np.array(
-    [seg[i][1, 1] - seg[i][0, 1] for i in range(0, len(seg), period)])
+# Determine the placement and angles of the arrows: one on every 7th segment
+# of the streamlines
+arrow_x, arrow_y, arrow_dx, arrow_dy = streamline_arrows(streams.lines,
+                                                         period=7)
 # Add arrows to streamlines
 q = ax.quiver(arrow_x,
               arrow_y,
@@ -33,26 +33,30 @@ import geocat.viz.util as gvutil
 ##############################################################################
 # Read in data:
 
-# Open a netCDF data file using xarray default engine and load the data into xarrays
-ds = xr.open_dataset(gdf.get("netcdf_files/83.nc"))
-
-# Extract slice of data
-TS = ds.TS.isel(time=0).drop('time')
-
-# Fix the artifact of not-shown-data around 0 and 360-degree longitudes
-TS = gvutil.xr_add_cyclic_longitudes(TS, "lon")
-
-# Calculate zonal mean
-mean = TS.mean(dim='lon')
-
-# Using meshgrid, a 2-D array can be created with the same shape as the
-# temperature data with the zonal mean for each latitude filling each row.
-# This way we can subtract each element of the mean 2-D array from the
-# corresponding element in the data array.
-waste, mean_grid = np.meshgrid(TS['lon'], mean)
-
-# Calculate deviations from zonal mean
-dev = TS.data - mean_grid
+# Open a netCDF data file using xarray default engine and load the data into
+# xarrays. Chunking the time dimension makes every variable a lazy dask array
+# that is read and computed one time step at a time.
+ds = xr.open_dataset(gdf.get("netcdf_files/83.nc"), chunks={'time': 1})
+
+# Fix the artifact of not-shown-data around 0 and 360-degree longitudes by
+# repeating the first longitude one grid step after the last one, as
+# gvutil.xr_add_cyclic_longitudes does, but lazily for all time steps
+cyclic_lon = ds.lon.values[-1] + (ds.lon.values[1] - ds.lon.values[0])
+TS_cyclic = xr.concat(
+    [ds.TS, ds.TS.isel(lon=[0]).assign_coords(lon=[cyclic_lon])], dim='lon')
+
+# Calculate the zonal mean and the deviations from it for all time steps.
+# The mean is taken over the cyclic grid, repeated column included. xarray
+# broadcasts the zonal mean of every latitude over the longitudes, so no
+# grid-sized copy of the mean is built, and nothing is computed until the
+# values of a time step are used.
+zonal_mean = TS_cyclic.mean(dim='lon')
+zonal_dev = TS_cyclic - zonal_mean
+
+# Extract slices of data; only this time step is read from the file
+TS = TS_cyclic.isel(time=0).drop_vars('time').compute()
+mean = zonal_mean.isel(time=0).drop_vars('time').compute()
+dev = zonal_dev.isel(time=0).drop_vars('time').compute()
 
 ##############################################################################
 # Plot:
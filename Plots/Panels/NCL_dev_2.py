@@ -33,20 +33,27 @@ import geocat.viz.util as gvutil
 ##############################################################################
 # Read in data:
 
-# Open a netCDF data file using xarray default engine and load the data into xarrays
+# Open a netCDF data file using xarray default engine and load the data into
+# xarrays. Chunking the time dimension makes every variable a lazy dask array
+# that is read and computed one time step at a time.
 ds = xr.open_dataset(gdf.get("netcdf_files/b003_TS_200-299.nc"),
-                     decode_times=False)
+                     decode_times=False,
+                     chunks={'time': 1})
 
-# Extract slice of data at first timestep
-TS_0 = ds.TS.isel(time=0).drop('time')
-
-# Calculate zonal mean
-mean = TS_0.mean(dim='lon')
+# Calculate the zonal mean of every time step
+zonal_mean = ds.TS.mean(dim='lon')
 
 # Calculate deviation from time average by finding the temperatures averaged
-# over all timesteps. Then that average is subtracted from the first timestep
+# over all timesteps. Then that average is subtracted from every timestep;
+# xarray broadcasts it over the time dimension, so the deviations of any
+# timestep can be plotted without computing the others.
 time_avg = ds.TS.mean(dim='time')
-time_dev = TS_0 - time_avg
+time_devs = ds.TS - time_avg
+
+# Extract slices of data at first timestep
+TS_0 = ds.TS.isel(time=0).drop_vars('time').compute()
+mean = zonal_mean.isel(time=0).drop_vars('time').compute()
+time_dev = time_devs.isel(time=0).drop_vars('time').compute()
 
 # Fix the artifact of not-shown-data around 0 and 360-degree longitudes
 TS_0 = gvutil.xr_add_cyclic_longitudes(TS_0, "lon")
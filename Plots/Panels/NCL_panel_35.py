@@ -23,7 +23,6 @@ import numpy as np
 from geocat.viz import cmaps as gvcmaps
 import geocat.viz.util as gvutil
 
-import math
 ################################################################
 # Definition of generate_2d_array and helper functions from https://github.com/NCAR/pyngl/blob/develop/src/ngl/__init__.py
 
@@ -84,10 +83,32 @@ highs_at -- an optional argument that is a list of coordinate
             the coordinates must be in the ranges specified in dims.
   """
 
+    arrays = generate_2d_arrays(dims,
+                                num_low,
+                                num_high, [minv], [maxv],
+                                seeds=[seed],
+                                highs_at=highs_at,
+                                lows_at=lows_at)
+    if arrays is None:
+        return None
+    return arrays[0]
+
+
+def generate_2d_arrays(dims, num_low, num_high, minv, maxv, seeds=[0], \
+                       highs_at=None, lows_at=None):
+    """
+Batched version of generate_2d_array: generates one smooth 2D array per
+entry of seeds in a single call, as an array of shape
+(len(seeds), dims[0], dims[1]). Each array is identical to the one
+generate_2d_array returns for the same arguments.
+minv, maxv -- either single values used for every array, or sequences
+              holding the minimum and maximum of each array.
+All other arguments are the same as for generate_2d_array.
+  """
+
     #  Globals for random numbers.
 
     global dfran_iseq
-    dfran_iseq = seed
 
     #  Check arguments.
 
@@ -126,11 +147,13 @@ highs_at -- an optional argument that is a list of coordinate
             "generate_2d_array: number of highs must be at most 25 - defaulting to 25."
         )
         num_high = 25
-    if (seed > 100 or seed < 0):
-        print(
-            "generate_2d_array: seed must be in the interval [0,100] - seed set to 0."
-        )
-        seed = 0
+    seeds = list(seeds)
+    for n, seed in enumerate(seeds):
+        if (seed > 100 or seed < 0):
+            print(
+                "generate_2d_array: seed must be in the interval [0,100] - seed set to 0."
+            )
+            seeds[n] = 0
     if not lows_at is None:
         if (len(lows_at) != num_low):
             print(
@@ -147,59 +170,78 @@ highs_at -- an optional argument that is a list of coordinate
 
     nx = int(dims[1])
     ny = int(dims[0])
-    out_array = np.zeros([nx, ny], 'f')
-    tmp_array = np.zeros([3, 51], 'f')
+    nfld = len(seeds)
+    minv = np.broadcast_to(np.asarray(minv, 'd'), [nfld])
+    maxv = np.broadcast_to(np.asarray(maxv, 'd'), [nfld])
+    tmp_array = np.zeros([nfld, 3, 51], 'f')
     fovm = 9. / float(nx)
     fovn = 9. / float(ny)
     nlow = max(1, min(25, num_low))
     nhgh = max(1, min(25, num_high))
     ncnt = nlow + nhgh
 
-    for k in range(num_low):
-        if not lows_at is None:
-            tmp_array[0,
-                      k] = float(lows_at[k][1])  # lows at specified locations.
-            tmp_array[1, k] = float(lows_at[k][0])
-            tmp_array[2, k] = -1.
-        else:
-            tmp_array[0, k] = 1. + (float(nx) -
-                                    1.) * _dfran()  # lows at random locations.
-            tmp_array[1, k] = 1. + (float(ny) -
-                                    1.) * _dfran()  # lows at random locations.
-            tmp_array[2, k] = -1.
-    for k in range(num_low, num_low + num_high):
-        if not highs_at is None:
-            tmp_array[0, k] = float(highs_at[k - num_low][1])  # highs locations
-            tmp_array[1, k] = float(highs_at[k - num_low][0])  # highs locations
-            tmp_array[2, k] = 1.
-        else:
-            tmp_array[0, k] = 1. + (float(nx) -
-                                    1.) * _dfran()  # highs at random locations.
-            tmp_array[1, k] = 1. + (float(ny) -
-                                    1.) * _dfran()  # highs at random locations.
-            tmp_array[2, k] = 1.
-
-    dmin = 1.e+36
-    dmax = -1.e+36
+    #  Positions of the highs and lows of each array.  Every array restarts
+    #  the random sequence at its own seed.
+
+    for n, seed in enumerate(seeds):
+        dfran_iseq = seed
+        for k in range(num_low):
+            if not lows_at is None:
+                tmp_array[n, 0, k] = float(
+                    lows_at[k][1])  # lows at specified locations.
+                tmp_array[n, 1, k] = float(lows_at[k][0])
+                tmp_array[n, 2, k] = -1.
+            else:
+                tmp_array[n, 0, k] = 1. + (float(nx) - 1.) * _dfran(
+                )  # lows at random locations.
+                tmp_array[n, 1, k] = 1. + (float(ny) - 1.) * _dfran(
+                )  # lows at random locations.
+                tmp_array[n, 2, k] = -1.
+        for k in range(num_low, num_low + num_high):
+            if not highs_at is None:
+                tmp_array[n, 0, k] = float(
+                    highs_at[k - num_low][1])  # highs locations
+                tmp_array[n, 1, k] = float(
+                    highs_at[k - num_low][0])  # highs locations
+                tmp_array[n, 2, k] = 1.
+            else:
+                tmp_array[n, 0, k] = 1. + (float(nx) - 1.) * _dfran(
+                )  # highs at random locations.
+                tmp_array[n, 1, k] = 1. + (float(ny) - 1.) * _dfran(
+                )  # highs at random locations.
+                tmp_array[n, 2, k] = 1.
+
+    #  Add the contribution of each high and low to the whole grid at once.
+    #  PyNGL's loops mix float32 array elements with Python floats, so the
+    #  arithmetic is done in the type NumPy uses for that mix to keep the
+    #  results bit-identical.
+
+    ftype = type(np.float32(0.) + 0.)
+    ival = np.arange(1, nx + 1, dtype=ftype)
+    jval = np.arange(1, ny + 1, dtype=ftype)
+    amplitude = (0.5 * (maxv - minv)).astype(ftype)
     midpt = 0.5 * (minv + maxv)
-    for j in range(ny):
-        for i in range(nx):
-            out_array[i, j] = midpt
-            for k in range(ncnt):
-                tempi = fovm * (float(i + 1) - tmp_array[0, k])
-                tempj = fovn * (float(j + 1) - tmp_array[1, k])
-                temp = -(tempi * tempi + tempj * tempj)
-                if (temp >= -20.):
-                    out_array[i,j] = out_array[i,j] +    \
-                       0.5*(maxv - minv)*tmp_array[2,k]*math.exp(temp)
-            dmin = min(dmin, out_array[i, j])
-            dmax = max(dmax, out_array[i, j])
-
-    out_array = (((out_array - dmin) / (dmax - dmin)) * (maxv - minv)) + minv
+    out_array = np.empty([nfld, nx, ny], 'f')
+    out_array[...] = midpt[:, None, None]
+    for k in range(ncnt):
+        tempi = ftype(fovm) * (ival - tmp_array[:, 0, k, None].astype(ftype))
+        tempj = ftype(fovn) * (jval - tmp_array[:, 1, k, None].astype(ftype))
+        temp = -(tempi[:, :, None] * tempi[:, :, None] +
+                 tempj[:, None, :] * tempj[:, None, :])
+        weight = amplitude * tmp_array[:, 2, k].astype(ftype)
+        contrib = weight[:, None, None] * np.exp(temp.astype('d')).astype(ftype)
+        out_array = np.where(temp >= -20., out_array.astype(ftype) + contrib,
+                             out_array).astype('f')
+
+    dmin = out_array.min(axis=(1, 2), keepdims=True)
+    dmax = out_array.max(axis=(1, 2), keepdims=True)
+    scale = (maxv - minv).astype('f')[:, None, None]
+    out_array = (((out_array - dmin) /
+                  (dmax - dmin)) * scale) + minv.astype('f')[:, None, None]
 
     del tmp_array
 
-    return np.transpose(out_array, [1, 0])
+    return np.transpose(out_array, [0, 2, 1])
 
 
 def _get_double(obj, name):
@@ -214,9 +256,11 @@ def _get_double_array(obj, name):
 # Create dummy data
 nx = 100
 ny = 100
-data1 = generate_2d_array((ny, nx), 10, 10, -19., 16., 0)
-data2 = generate_2d_array((ny, nx), 10, 10, -28., 15., 1)
-data3 = generate_2d_array((ny, nx), 10, 10, -25., 18., 2)
+data1, data2, data3 = generate_2d_arrays((ny, nx),
+                                         10,
+                                         10, [-19., -28., -25.],
+                                         [16., 15., 18.],
+                                         seeds=[0, 1, 2])
 
 ###############################################################################
 # Create figure and axes using gvutil
@@ -18,8 +18,7 @@ See following URLs to see the reproduced NCL plot & script:
 
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
-from matplotlib.collections import PatchCollection
-from matplotlib.patches import Polygon
+from matplotlib.collections import PathCollection
 import matplotlib.colors as colors
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 import matplotlib.cm as cm
@@ -29,6 +28,9 @@ import numpy as np
 import geocat.datafiles as gdf
 from geocat.viz import util as gvutil
 
+from gallery_tools.shapes import (filter_polygons, part_index, polygon_paths,
+                                  read_polygons)
+
 ###############################################################################
 # Read in data:
 
@@ -84,21 +86,6 @@ def getStatePopulations(state_population_file):
             population_dict[name] = pop
     return population_dict
 
-###############################################################################
-# Define helper function to get the color of each state based on its population
-
-def findDivColor(colorbounds, pdata):
-
-    for x in range(len(colorbounds)):
-
-        if pdata >= colorbounds[len(colorbounds) - 1]:
-            return colormap.colors[x - 1]
-        if pdata >= colorbounds[x]:
-            continue
-        else:
-            # Index is 'x-1' because colorbounds is one item longer than colormap
-            return colormap.colors[x - 1]
-
 ###############################################################################
 # Define helper function to remove ticks from axes
 
@@ -108,78 +95,20 @@ def removeTicks(axis):
     axis.get_yaxis().set_visible(False)
 
 ###############################################################################
-# Define helper function to plot and color each state
-
-def plotRegion(region, axis, xlim, puertoRico, waterBody):
-
-    # Create empty lists for filled polygons or" patches" and "water_patches"
-    patches = []
-    water_patches = []
-    
-    # Plot each shape within a region (ex. mainland Alaska and all of it's surrounding Alaskan islands)
-    for i in range(len(region.shape.parts)):
-
-        i_start = region.shape.parts[i]
-        if i == len(region.shape.parts) - 1:
-            i_end = len(region.shape.points)
-        else:
-            i_end = region.shape.parts[i + 1]
-
-        # Create new empty lists to hold lat and lon coordinates
-        x = []
-        y = []
-
-        # Get every coordinate within every shape (as long as it is within the x coordinate limits)
-        for i in region.shape.points[i_start:i_end]:
-            if xlim[0] is not None and i[0] < xlim[0]:
-                continue
-            if xlim[1] is not None and i[0] > xlim[1]:
-                continue
-            else:
-                x.append(i[0])
-                y.append(i[1])
-
-        # Plot outline of each region
-        axis.plot(x, y, color='black', linewidth=0.1, zorder=1)
-
-        # Fill each state with color:
-        # Determine the region to be plotted (Puerto Rico or United States)
-        if waterBody is False:
-            if puertoRico is False:
-                abbrevname = shape.record[-1].split(".")
-                abbrevstate = abbrevname[1]
-            else:
-                abbrevstate = 'PR'
-
-        # If the region being plotted is a state with a population
-        if waterBody is False:
-            pop = population_dict[abbrevstate]
-            color = findDivColor(colorbounds, pop)
-            # Set characteristics and measurements of each filled polygon "patch"
-            patches.append(
-                Polygon(np.vstack((x, y)).T, True, color=color, linewidth=0.1))
-
-        # If the region being plotted is a body of water with no population
-        else:
-            # Set characteristics and measurements of each filled polygon "patch"
-            water_patches.append(
-                Polygon(np.vstack((x, y)).T, True, color='white', linewidth=.7))
-
-    pc = PatchCollection(patches,
-                         match_original=True,
-                         edgecolor='k',
-                         linewidths=0.1,
-                         zorder=2)
-    # Plot filled region on axis
-    axis.add_collection(pc)
+# Define helper function to plot and color the regions of one axis
+
+def plotRegion(axis, vertices, parts, owner, keep, facecolors, **kwargs):
 
-    wpc = PatchCollection(water_patches,
-                         match_original=True,
-                         edgecolor='white',
-                         linewidth=.8,
-                         zorder=3)
-    # Plot filled region on axis
-    axis.add_collection(wpc)
+    # Drop the vertices outside of the region (ex. beyond the x coordinate
+    # limits of an inset) and the parts left without any vertex
+    vertices, parts, owner = filter_polygons(vertices, parts, owner, keep)
+
+    # Plot all filled polygons of the axis as one collection, each part colored
+    # by the shape it belongs to
+    pc = PathCollection(polygon_paths(vertices, parts),
+                        facecolors=facecolors[owner],
+                        **kwargs)
+    axis.add_collection(pc)
 
 ###############################################################################
 # Plot:
@@ -212,27 +141,61 @@ removeTicks(axin3)
 # Get population of each state
 population_dict = getStatePopulations(state_population_file)
 
-# Plot every shape in the US shapefile
-for shape in us.shapeRecords():
-
-    if shape.record[3] == 'Alaska':
-        plotRegion(shape, axin1, [None, 100], puertoRico=False, waterBody=False)
-    elif shape.record[3] == 'Hawaii':
-        plotRegion(shape,
-                   axin2, [-161, None],
-                   puertoRico=False,
-                   waterBody=False)
-    else:
-        plotRegion(shape, ax1, [None, None], puertoRico=False, waterBody=False)
+# Read every shape of the US shapefile at once
+vertices, parts, owner = read_polygons(us)
+records = us.records()
+names = np.array([record[3] for record in records])
+
+# Color each state based on its population, for all states at once
+pops = np.array(
+    [population_dict[record[-1].split(".")[1]] for record in records])
+statecolors = colormap(norm(pops))
+
+# Name and longitude of the state each vertex belongs to
+vertexnames = names[owner][part_index(vertices, parts)]
+lon = vertices[:, 0]
+
+# Plot Alaska, Hawaii and the mainland, each on its axis and within its
+# x coordinate limits
+alaska = (vertexnames == 'Alaska') & (lon <= 100)
+hawaii = (vertexnames == 'Hawaii') & (lon >= -161)
+mainland = (vertexnames != 'Alaska') & (vertexnames != 'Hawaii')
+for axis, keep in [(axin1, alaska), (axin2, hawaii), (ax1, mainland)]:
+    plotRegion(axis,
+               vertices,
+               parts,
+               owner,
+               keep,
+               statecolors,
+               edgecolor='k',
+               linewidths=0.1,
+               zorder=2)
 
 # Plot every shape in the puerto rico shapefile
-for shape in pr.shapeRecords():
-    plotRegion(shape, axin3, [None, None], puertoRico=True, waterBody=False)
+vertices, parts, owner = read_polygons(pr)
+prcolors = colormap(norm(np.full(len(pr), population_dict['PR'])))
+plotRegion(axin3,
+           vertices,
+           parts,
+           owner,
+           np.ones(len(vertices), dtype=bool),
+           prcolors,
+           edgecolor='k',
+           linewidths=0.1,
+           zorder=2)
 
 # Plot every body of water shape in the detailed US shapefile
-for shape in usdetailed.shapeRecords():
-    if shape.record[9] == 'Water body':
-        plotRegion(shape, ax1, [None, None], puertoRico=False, waterBody=True)
+vertices, parts, owner = read_polygons(usdetailed)
+water = np.array([record[9] == 'Water body' for record in usdetailed.records()])
+plotRegion(ax1,
+           vertices,
+           parts,
+           owner,
+           water[owner][part_index(vertices, parts)],
+           np.full((len(water), 4), colors.to_rgba('white')),
+           edgecolor='white',
+           linewidth=.8,
+           zorder=3)
 
 # Set title using helper function from geocat-viz
 title = r"$\bf{Population}$" + " " + r"$\bf{in}$" + " " + r"$\bf{Millions}$" + " " + r"$\bf{(2014)}$"
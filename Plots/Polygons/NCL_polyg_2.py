@@ -30,10 +30,11 @@ import matplotlib.cm as cm
 from geocat.viz import util as gvutil
 
 import geocat.datafiles as gdf
-import cartopy.io.shapereader as shpreader
-import shapely.geometry as sgeom
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
+from gallery_tools.climdiv import classify, division_collection, read_divisions
+from gallery_tools.natural_earth import projected_geometries
+
 ###############################################################################
 # Read in data
 
@@ -54,21 +55,24 @@ colormap = colors.ListedColormap([
 colorbounds = [0, 5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80, 90, 100]
 
 ###############################################################################
-# Define helper function to determine which color to fill the divisions based on precipitation data
-
+# Compute the average annual precipitation of every climate division
 
-def findDivColor(colorbounds, pdata):
+# Stack the monthly precipitation of all climate divisions into one
+# (division, month) array and their borders into one array of coordinates.
+# The first variable in the data set is skipped as it is not a climate
+# division; it only has one attribute, 'current date'.
+_, precipitation, vertices, parts = read_divisions(ds)
 
-    for x in range(len(colorbounds)):
+# Get number of years of data by dividing number of months recorded by 12 (12 months per year)
+numYears = precipitation.shape[1] / 12
 
-        if pdata >= colorbounds[len(colorbounds) - 1]:
-            return colormap.colors[x - 1]
-        if pdata >= colorbounds[x]:
-            continue
-        else:
-            # Index is 'x-1' because colorbounds is one item longer than colormap
-            return colormap.colors[x - 1]
+# Rather than looping through the whole array to find the sum of each 12 values (a year's worth of data),
+# adding each sum to an array, and then finding the average of the values in the array, as seen in the NCL
+# script, the precipitation of all divisions is summed with one call and divided by numYears
+precipitationdata = precipitation.sum(axis=1) / numYears
 
+# Get color of every climate division
+divcolors = colormap(classify(precipitationdata, colorbounds))
 
 ###############################################################################
 # Create plot
@@ -85,11 +89,14 @@ ax = plt.axes([.05, -.05, .9, 1],
 # Set latitude and longitude extent of map
 ax.set_extent([-119, -74, 18, 50], ccrs.Geodetic())
 
-# Set shape name of map (which depicts the United States)
+# Set shape name of map (which depicts the United States) and get its
+# geometries clipped to the map and projected, from a cache after the first run
 shapename = 'admin_1_states_provinces_lakes_shp'
-states_shp = shpreader.natural_earth(resolution='110m',
-                                     category='cultural',
-                                     name=shapename)
+states, _ = projected_geometries('cultural',
+                                 shapename,
+                                 '110m',
+                                 ax.projection,
+                                 extent=[-119, -74, 18, 50])
 
 # Set title and title fontsize of plot using gvutil function instead of matplotlib function call
 gvutil.set_titles_and_labels(
@@ -99,46 +106,21 @@ gvutil.set_titles_and_labels(
     maintitlefontsize=18)
 
 # Add outlines of each state within the United States
-for state in shpreader.Reader(states_shp).geometries():
-
-    facecolor = 'white'
-    edgecolor = 'black'
-
-    ax.add_geometries([state],
-                      ccrs.PlateCarree(),
-                      facecolor=facecolor,
-                      edgecolor=edgecolor)
-
-# For each variable (climate division) in data set, create outline on map and fill with random color
-for varname, da in ds.data_vars.items():
-
-    # This condition is included because first item in xarray only has one attribute, 'current date'
-    if hasattr(da, 'state_name'):
-        # Get number of years of data by dividing number of months recorded (length of array) by 12 (12 months per year)
-        numYears = len(da.values) / 12
-
-        # Get precipitation data for each climate division:
-        # Rather than looping through the whole array to find the sum of each 12 values (a year's worth of data),
-        # adding each sum to an array, and then finding the average of the values in the array, as seen in the NCL
-        # script, the one-line python method involves summing the dataset values and then dividing it by numYears (calculated in line 99)
-        precipitationdata = sum(da.values) / numYears
-
-        # Get borders of each climate division
-        lat = da.lat
-        lon = da.lon
-
-        # Get color of climate division
-        color = findDivColor(colorbounds, precipitationdata)
-
-        # Use "shapely geometry" module to create division outlines from lat/lon coordinates
-        track = sgeom.LineString(zip(lon, lat))
-
-        # Add division outlines to map
-        im = ax.add_geometries([track],
-                               ccrs.PlateCarree(),
-                               facecolor=color,
-                               edgecolor='black',
-                               linewidths=.5)
+ax.add_geometries(states,
+                  ax.projection,
+                  facecolor='white',
+                  edgecolor='black')
+
+# Add all climate divisions to the map as one collection, with their borders
+# projected in a single call
+divisions = division_collection(vertices,
+                                parts,
+                                ax.projection,
+                                facecolors=divcolors,
+                                edgecolor='black',
+                                linewidths=.5,
+                                zorder=2)
+ax.add_collection(divisions, autolim=False)
 
 # Create and plot colorbar
 
@@ -23,8 +23,9 @@ import matplotlib.pyplot as plt
 # Create dummy data:
 
 numpoints = 100
-lon = np.random.uniform(0, 360, numpoints)
-lat = np.random.uniform(5, 90, numpoints)
+random = np.random.default_rng(seed=1)
+lon = random.uniform(0, 360, numpoints)
+lat = random.uniform(5, 90, numpoints)
 
 ###############################################################################
 
@@ -27,7 +27,6 @@ Note:
 ###############################################################################
 # Import packages:
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import matplotlib.colors as colors
 import matplotlib.cm as cm
 import matplotlib.ticker as mticker
@@ -39,6 +38,8 @@ import cartopy.feature as cfeature
 import geocat.datafiles as gdf
 from geocat.viz import util as gvutil
 
+from gallery_tools.shapes import shapefile_collection
+
 ###############################################################################
 # Read in data:
 
@@ -60,22 +61,15 @@ colorbounds = [0.5, 1.5, 2.5, 3.5, 4.5]
 norm = colors.BoundaryNorm(colorbounds, colormap.N)
 
 ###############################################################################
-# Helper function to determine state color:
-
+# Determine the color of each state:
 
-def color_assignment(record):
-    population = record.PERSONS
-    unempolyment = record.UNEMPLOY
-    percent = unempolyment / population
-    if (0.01 <= percent and percent < 0.02):
-        return colormap.colors[0]
-    elif (0.02 <= percent and percent < 0.03):
-        return colormap.colors[1]
-    elif (0.03 <= percent and percent < 0.04):
-        return colormap.colors[2]
-    elif (0.04 <= percent):
-        return colormap.colors[3]
+# Read all records once and compute the unemployment percentages together
+records = shapefile.records()
+percent = np.array([record.UNEMPLOY / record.PERSONS for record in records])
 
+# Class 1 for [0.01, 0.02), 2 for [0.02, 0.03), 3 for [0.03, 0.04) and 4 for
+# 0.04 and above; these fall between the color bounds above
+category = np.digitize(percent, [0.02, 0.03, 0.04]) + 1
 
 ###############################################################################
 # Plot:
@@ -87,39 +81,16 @@ ax.set_extent([-125, -74, 22, 50])
 ax.add_feature(cfeature.LAND, color='silver', zorder=0)
 ax.add_feature(cfeature.LAKES, color='white', zorder=1)
 
-for i in range(0, len(shapefile.shapes())):
-    shape = shapefile.shape(i)
-    record = shapefile.record(i)
-    color = color_assignment(record)
-    # if a shape has multiple parts make each one a separate patch
-    if len(shape.parts) > 1:
-        for j in range(0, len(shape.parts)):
-            start_index = shape.parts[j]
-            # the last part uses the remaining points and doesn't require and end_index
-            if (j is (len(shape.parts) - 1)):
-                patch = mpatches.Polygon(shape.points[start_index:],
-                                         facecolor=color,
-                                         edgecolor='black',
-                                         linewidth=0.5,
-                                         transform=ccrs.PlateCarree(),
-                                         zorder=2)
-            else:
-                end_index = shape.parts[j + 1]
-                patch = mpatches.Polygon(shape.points[start_index:end_index],
-                                         facecolor=color,
-                                         edgecolor='black',
-                                         linewidth=0.5,
-                                         transform=ccrs.PlateCarree(),
-                                         zorder=2)
-            ax.add_patch(patch)
-    else:
-        patch = mpatches.Polygon(shape.points,
-                                 facecolor=color,
-                                 edgecolor='black',
-                                 linewidth=0.5,
-                                 transform=ccrs.PlateCarree(),
-                                 zorder=2)
-        ax.add_patch(patch)
+# Draw every part of every state as one collection, projected in one call
+states = shapefile_collection(shapefile,
+                              ax.projection,
+                              values=category,
+                              cmap=colormap,
+                              norm=norm,
+                              edgecolor='black',
+                              linewidth=0.5,
+                              zorder=2)
+ax.add_collection(states, autolim=False)
 
 # Create colorbar
 plt.colorbar(cm.ScalarMappable(cmap=colormap, norm=norm),
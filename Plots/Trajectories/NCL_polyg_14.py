@@ -3,7 +3,7 @@ NCL_polyg_14.py
 ================
 This script illustrates the following concepts:
     - Drawing polylines and markers using great circle paths
-    - Using geographiclib to calculate a great circle path
+    - Using the GeographicLib algorithms (through pyproj) to calculate a great circle path
     - Attaching polylines and markers to a map plot
     
 See following URLs to see the reproduced NCL plot & script:
@@ -19,11 +19,12 @@ import numpy as np
 import cartopy.crs as ccrs
 import matplotlib.pyplot as plt
 import cartopy.feature as cfeature
-from geographiclib.geodesic import Geodesic
 from cartopy.mpl.gridliner import LongitudeFormatter, LatitudeFormatter
 
 from geocat.viz import util as gvutil
 
+from gallery_tools.geodesics import geodesic_paths
+
 ###############################################################################
 # Plot
 
@@ -58,25 +59,15 @@ def Plot(color, ext, xext, yext, npts, title, subt, style, pt):
     ax.set_extent(ext, ccrs.PlateCarree())
     ax.add_feature(cfeature.LAND, color="lightgrey")
 
-    # This gets geodesic between the two points
+    # This gets points on the geodesic between the two points
     # WGS84 ellipsoid is used
     # yext and xext refer to the start and stop points for the curve
     # [0] being start, [1] being stop
-    gl = Geodesic.WGS84.InverseLine(yext[0], xext[0], yext[1], xext[1])
-    npoints = npts
-
-    # Compute points on the geodesic, and plot them
-    # gl.s13 is the total length of the geodesic
-    # the points are equally spaced by 'true distance', but visually
-    # there is a slight distortion due to curvature/projection style
-    lons = []
-    lats = []
-    for ea in np.linspace(0, gl.s13, npoints):
-        g = gl.Position(ea, Geodesic.STANDARD | Geodesic.LONG_UNROLL)
-        lon2 = g["lon2"]
-        lat2 = g["lat2"]
-        lons.append(lon2)
-        lats.append(lat2)
+    # The points are equally spaced by 'true distance', but visually
+    # there is a slight distortion due to curvature/projection style.
+    # geodesic_paths also takes arrays of start and stop points, to compute
+    # many routes at once
+    lons, lats = geodesic_paths(xext[0], yext[0], xext[1], yext[1], npts)
 
     plt.plot(lons, lats, style, color=color, transform=ccrs.Geodetic())
     ax.plot(lons, lats, pt, transform=ccrs.PlateCarree())
@@ -22,6 +22,8 @@ import matplotlib.ticker as ticker
 import numpy as np
 from geocat.viz import util as gvutil
 
+from gallery_tools.trajectories import plot_trajectories
+
 ###############################################################################
 # Read in data:
 
@@ -29,25 +31,6 @@ from geocat.viz import util as gvutil
 ds = xr.open_dataset(gdf.get('netcdf_files/traj_data.nc'))
 sdata = ds.get('sdata')
 
-###############################################################################
-# Define helper function to plot every n-th timestep:
-
-
-def plot_nth_timestep(nparrayy, nparrayx, n):
-
-    for x in range(0, len(nparrayx)):
-
-        # Plot green starting point of each trajectory
-        if x == 0:
-            y, x = nparrayy[x], nparrayx[x]
-            plt.scatter(x, y, color='green', s=1, zorder=2.5)
-
-        # Plot every n-th timestamp
-        if x % n == 0:
-            y, x = nparrayy[x], nparrayx[x]
-            plt.scatter(x, y, color='black', s=1, zorder=2.5)
-
-
 ###############################################################################
 # Plot:
 
@@ -78,17 +61,13 @@ traj = [1, 10, 53, 67, 80]
 # Set colors of each trajectory line
 trajlinecolors = ["red", "blue", "green", "grey", "magenta"]
 
-# Plot each trajectory
-for i in range(len(traj)):
-
-    # Extract latitude
-    ypt = (np.array(sdata[1, :, traj[i]]) - 360)
-
-    # Extract longitude
-    xpt = np.array(sdata[2, :, traj[i]])
-
-    plt.plot(ypt, xpt, color=trajlinecolors[i], linewidth=0.4)
+# Extract longitudes and latitudes of all selected trajectories at once, with
+# shape (trajectory, time)
+lon = sdata[1, :, traj].values.T - 360
+lat = sdata[2, :, traj].values.T
 
-    plot_nth_timestep(xpt, ypt, n=4)
+# Plot all trajectories as one collection, with markers on every 4th timestep
+# and green starting points
+plot_trajectories(ax, lon, lat, colors=trajlinecolors, n=4)
 
 plt.show()
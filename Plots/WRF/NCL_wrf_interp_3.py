@@ -19,7 +19,6 @@ from netCDF4 import Dataset
 import numpy as np
 import matplotlib.pyplot as plt
 import xarray as xr
-import os
 
 from wrf import (to_np, getvar, CoordPair, vertcross, latlon_coords)
 import geocat.datafiles as gdf
@@ -34,12 +33,11 @@ toinclude = ['PH', 'P', 'HGT', 'PHB', 'QVAPOR']
 ds = xr.open_mfdataset([gdf.get('netcdf_files/wrfout_d03_2012-04-22_23_00_00_Z.nc'),
                         gdf.get('netcdf_files/wrfout_d03_2012-04-22_23_00_00_QV.nc')])
 
-# specify a unique output file name to use to read in combined dataset later
-file3 = 'wrfout_d03_2012-04-22_23.nc'
-mrg = ds[toinclude].to_netcdf(file3)
-
-# Read in the data and extract variables 
-wrfin = Dataset(('wrfout_d03_2012-04-22_23.nc'))
+# Serialize the combined dataset to netCDF in memory rather than to a file
+# and open it from there, since wrf-python reads from netCDF4 Datasets. The
+# name is only used to identify the in-memory dataset.
+merged = ds[toinclude].to_netcdf()
+wrfin = Dataset('wrfout_d03_2012-04-22_23.nc', memory=merged)
 
 z = getvar(wrfin, "z")
 qv = getvar(wrfin, "QVAPOR")
@@ -60,10 +58,8 @@ qv_cross = vertcross(qv,
                      end_point=end_point,
                      latlon=True)
 
-# Close 'wrfin' to prevent PermissionError if code is run more than once locally
+# Close 'wrfin' to release the in-memory dataset
 wrfin.close()
-# Remove created wrfout file from local directory 
-os.remove('wrfout_d03_2012-04-22_23.nc')
 
 ###############################################################################
 # Plot the data
@@ -33,7 +33,8 @@ from geocat.viz import util as gvutil
 # Note that range() top value is not included in the returned array of values.
 
 x_data = np.arange(1950, 2006)
-y_data = np.random.uniform(-4, 4, 56)
+random = np.random.default_rng(seed=1)
+y_data = random.uniform(-4, 4, 56)
 
 # Print out a formatted message; note the starting 'f' for the string.
 print(
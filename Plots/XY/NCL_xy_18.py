@@ -26,60 +26,48 @@ from matplotlib import pyplot as plt
 import geocat.datafiles as gdf
 from geocat.viz import util as gvutil
 
+from gallery_tools.ensemble import ensemble_statistics, open_ensemble
+
 ###############################################################################
 # Read in data:
 # -------------
 #
 # Open files and read in monthly data
 #
-# Xarray's ``open_mfdataset`` (open multi-file dataset) method will attempt to
-# merge all of the individual datasets (i.e., NetCDF files) into one single
-# Xarray ``Dataset``.  The ``concat_dim`` and ``combine`` keyword arguments to
-# this method give you control over how this merging takes place (see the
-# Xarray documentation for more information).
-#
-# In the below example, each NetCDF file represents the same variables and
-# coordinates, but from a different ensemble member.  There is no ``case`` (or
-# ensemble) dimension explicitly declared in the files, so we use the
-# ``concat_dim`` argument to state that we will create a new dimension called
-# ``case`` that spans the ensemble members.  Here, each file contains a
-# ``TREFHT`` variable that depends upon dimensions ``(time, lat, lon)`` and
-# coordinate variables ``time``, ``lat`` and ``lon``.  After opening these
-# files with ``open_mfdataset``, the resulting Xarray ``Dataset`` will consist
-# of a ``TREFHT`` variable that depends upon dimensions ``(case, time, lat, lon)``
-# and coordinate variables ``case``, ``time``, ``lat`` and ``lon``.
+# Each NetCDF file represents the same variables and coordinates, but from a
+# different ensemble member.  There is no ``case`` (or ensemble) dimension
+# explicitly declared in the files, so the members are stacked along a new
+# dimension called ``case``.  Here, each file contains a ``TREFHT`` variable
+# that depends upon dimensions ``(time, lat, lon)`` and coordinate variables
+# ``time``, ``lat`` and ``lon``.  The ``open_ensemble`` helper from
+# ``gallery_tools/ensemble.py`` opens the member files concurrently and
+# returns an Xarray ``Dataset`` with a ``TREFHT`` variable that depends upon
+# dimensions ``(case, time, lat, lon)`` and coordinate variables ``case``,
+# ``time``, ``lat`` and ``lon``.  It works like Xarray's ``open_mfdataset``
+# (open multi-file dataset) method with ``concat_dim='case'`` and
+# ``combine='nested'``, but decodes the ``time`` coordinate once for all
+# members, which share it, instead of once per file.  When the
+# ``GALLERY_ENSEMBLE_PERSIST`` environment variable is set (or with
+# ``persist=True``), the stacked ensemble is also stored as a chunked Zarr
+# store, which later runs of this script read instead of the member files.
 #
 # **NOTE:** One of the files (``TREFHT.B06.69.atm.1890-1999ANN.nc``) contains
 # a ``time`` coordinate variable with a ``calendar`` attribute having the
 # value ``noleap`` (i.e., the "No leap year" non-standard calendar).  The
 # ``time`` coordinate variable in all of the other files do not have a
-# ``calendar`` attribute *at all*.  By default, when Xarray's ``open_mfdataset``
-# reads each individual dataset, it will attempt to decode the ``time`` coordinate
-# into an appropriate ``datetime`` object, so that you can then take advantage of
+# ``calendar`` attribute *at all*.  By default, when Xarray reads each
+# individual dataset, it will attempt to decode the ``time`` coordinate into
+# an appropriate ``datetime`` object, so that you can then take advantage of
 # Xarray's (and Pandas's) excellent time-series manipulation capabilities.
 # However, due to the lacking ``calendar`` attribute in most of the files
 # (which, according to CF conventions, defaults to the ``standard`` Gregorian
 # calendar) and the ``noleap`` calendar attribute in one of the files, the
-# ``time`` coordinate variable will be interpreted as "non-uniform" across all
-# of the datasets.  To fix this problem, we tell Xarray's ``open_mfdataset``
-# function to *not* decode the ``time`` coordinate into ``datetime`` objects
-# by passing the ``decode_times=False`` argument.  Second, we pass a pre-processing
-# function via the ``preprocess`` argument to ``open_mfdataset``, telling
-# Xarray to read each individual dataset from file (with the ``decode_times=False``
-# option) and then modify the resulting dataset according to the pre-processing
-# function.  In this case, the pre-processing function (``assume_noleap_calendar``)
-# takes the single-file dataset, sets the ``calendar`` attribute of the ``time``
-# coordinate variable to ``noleap``, and returns the *decoded* dataset (using
-# the Xarray function ``decode_cf``).  Work-arounds like this are needed
-# whenever you have "errors" or "inconsistancies" in your data.
-
-
-# Define the xarray.open_mfdataset pre-processing function
-# (Must take an xarray.Dataset as input and return an xarray.Dataset)
-def assume_noleap_calendar(ds):
-    ds.time.attrs['calendar'] = 'noleap'
-    return xr.decode_cf(ds)
-
+# ``time`` coordinate variable would be interpreted as "non-uniform" across
+# all of the datasets.  To fix this problem, we pass ``calendar='noleap'``,
+# which reads the files *without* decoding the ``time`` coordinate, sets its
+# ``calendar`` attribute to ``noleap`` and only then decodes it.
+# Work-arounds like this are needed whenever you have "errors" or
+# "inconsistancies" in your data.
 
 # Create a dataset for the "natural" (i.e., no anthropogenic effects) data
 nfiles = [
@@ -88,11 +76,9 @@ nfiles = [
     gdf.get("netcdf_files/TREFHT.B06.68.atm.1890-1999ANN.nc"),
     gdf.get("netcdf_files/TREFHT.B06.69.atm.1890-1999ANN.nc")
 ]
-nds = xr.open_mfdataset(nfiles,
-                        concat_dim='case',
-                        combine='nested',
-                        preprocess=assume_noleap_calendar,
-                        decode_times=False)
+nds = open_ensemble(nfiles,
+                    variables=['TREFHT'],
+                    calendar='noleap')
 
 # Create a dataset for the "natural + anthropogenic" data
 vfiles = [
@@ -101,18 +87,15 @@ vfiles = [
     gdf.get("netcdf_files/TREFHT.B06.60.atm.1890-1999ANN.nc"),
     gdf.get("netcdf_files/TREFHT.B06.57.atm.1890-1999ANN.nc")
 ]
-vds = xr.open_mfdataset(vfiles,
-                        concat_dim='case',
-                        combine='nested',
-                        preprocess=assume_noleap_calendar,
-                        decode_times=False)
+vds = open_ensemble(vfiles,
+                    variables=['TREFHT'],
+                    calendar='noleap')
 
 # Read the "weights" file
-# (The xarray.Dataset.expand_dims call adds the longitude dimension to the
-# dataset, which originally depends only upon the latitude dimension. This
-# arguably makes computing the weighted means below more straight-forward.)
+# (The weights depend only upon the latitude dimension. They are applied
+# along latitude and broadcast along longitude when computing the weighted
+# means below, without building a 2D array of weights.)
 gds = xr.open_dataset(gdf.get("netcdf_files/gw.nc"))
-gds = gds.expand_dims(dim={'lon': nds.lon})
 
 ###############################################################################
 # Observations:
@@ -133,36 +116,29 @@ obs_time = xr.cftime_range('1856-07-16T22:00:00',
 obs = xr.DataArray(name='TREFHT', data=obs_data, coords=[('time', obs_time)])
 
 ###############################################################################
-# NCL-based Weighted Mean Function:
-# ---------------------------------
+# Weighted means and ensemble statistics:
+# ---------------------------------------
 #
-# We define this function just for convenience.  This is equivalent to how
-# NCL computes the weighted mean.
-
-
-def horizontal_weighted_mean(var, wgts):
-    return (var * wgts).sum(dim=['lat', 'lon']) / wgts.sum(dim=['lat', 'lon'])
-
-
-###############################################################################
-# Natural data:
-# -------------
-#
-# We compute the weighted mean across the latitude and longitude dimensions
-# (leaving only the ``case`` and ``time`` dimensions), and then we compute the
-# anomaly measured from the average of the first 30 years.
-
-gavn = horizontal_weighted_mean(nds["TREFHT"], gds["gw"])
-gavan = gavn - gavn.sel(time=slice('1890', '1920')).mean(dim='time')
-
-###############################################################################
-# Natural + Anthropogenic data:
-# -----------------------------
-#
-# We do the same thing for the "natural + anthropogenic" data.
-
-gavv = horizontal_weighted_mean(vds["TREFHT"], gds["gw"])
-gavav = gavv - gavv.sel(time=slice('1890', '1920')).mean(dim='time')
+# For each dataset, the ``ensemble_statistics`` helper from
+# ``gallery_tools/ensemble.py`` computes the weighted mean across the latitude
+# and longitude dimensions (leaving only the ``case`` and ``time``
+# dimensions), equivalent to how NCL computes the weighted mean, and the
+# anomaly measured from the average of the first 30 years.  Along the way it
+# finds the ``min``, ``max``, and ``mean`` of the anomalies along the ``case``
+# (i.e., ensemble) dimension (leaving only the ``time`` dimension).  The data
+# of all ensemble members is read only once to do all of this.
+
+# Natural data
+nstats = ensemble_statistics(nds["TREFHT"],
+                             gds["gw"],
+                             baseline=slice('1890', '1920'))
+gavan = nstats['anomaly']
+
+# Natural + Anthropogenic data
+vstats = ensemble_statistics(vds["TREFHT"],
+                             gds["gw"],
+                             baseline=slice('1890', '1920'))
+gavav = vstats['anomaly']
 
 ###############################################################################
 # Observation data:
@@ -174,20 +150,20 @@ obs_avg = obs.sel(time=slice('1890', '1999')) - obs.sel(
     time=slice('1890', '1920')).mean(dim='time')
 
 ###############################################################################
-# Calculate the ensemble Min. & Max. & Mean:
-# ------------------------------------------
+# Ensemble Min. & Max. & Mean:
+# ----------------------------
 #
-# Here we find the ``min``, ``max``, and ``mean`` along the ``case`` (i.e.,
-# ensemble) dimension (leaving only the ``time`` dimension) for both of our
-# datasets.  We compute the equivalent anomaly for the observations data.
+# Here we take the ``min``, ``max``, and ``mean`` along the ``case`` (i.e.,
+# ensemble) dimension for both of our datasets.  We computed the equivalent
+# anomaly for the observations data above.
 
-gavan_min = gavan.min(dim='case')
-gavan_max = gavan.max(dim='case')
-gavan_avg = gavan.mean(dim='case')
+gavan_min = nstats['min']
+gavan_max = nstats['max']
+gavan_avg = nstats['mean']
 
-gavav_min = gavav.min(dim='case')
-gavav_max = gavav.max(dim='case')
-gavav_avg = gavav.mean(dim='case')
+gavav_min = vstats['min']
+gavav_max = vstats['max']
+gavav_avg = vstats['mean']
 
 ###############################################################################
 # Plot:
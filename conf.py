@@ -12,9 +12,13 @@
 #
 import importlib
 import os
+import sys
 import warnings
-# import sys
-# sys.path.insert(0, os.path.abspath('.'))
+sys.path.insert(0, os.path.abspath('.'))
+
+# Worker processes of a parallel gallery build inherit the environment, so
+# make sure every one of them starts with the non-interactive Agg backend.
+os.environ.setdefault('MPLBACKEND', 'agg')
 
 # -- Project information -----------------------------------------------------
 
@@ -82,16 +86,58 @@ sphinx_gallery_conf = {
     'gallery_dirs': ['gallery'
                     ],  # path to where to save gallery generated output
     'within_subsection_order': ExampleTitleSortKey,
+    # Spread the example scripts over Sphinx's worker processes when the
+    # build is run with "-j N" (e.g. `make html SPHINXOPTS="-j auto"`). A
+    # plain `make html` still executes them one after another. Results are
+    # gathered back in gallery order, so the output matches a serial build.
+    'parallel': True,
+    # Resolve geocat.datafiles paths through the index written by the
+    # prefetch stage (see gallery_tools/datafiles.py), and keep the datasets
+    # opened by one example for the next ones run in the same process (see
+    # gallery_tools/dataset_cache.py). With GALLERY_NETCDF3_MMAP set,
+    # memory-map classic netCDF inputs (see gallery_tools/netcdf3.py); with
+    # GALLERY_ZARR_MIRROR set, read the netCDF inputs from their Zarr mirror
+    # (see gallery_tools/zarr_mirror.py)
+    'reset_modules': ('matplotlib', 'seaborn',
+                      'gallery_tools.datafiles.use_index',
+                      'gallery_tools.dataset_cache.use_cache',
+                      'gallery_tools.netcdf3.use_mmap',
+                      'gallery_tools.zarr_mirror.use_mirror'),
 }
 
+# Record per-example timings and memory use when GALLERY_BENCHMARK is set
+from gallery_tools import benchmark, build_cache, datafiles, dataset_cache
+if os.environ.get('GALLERY_BENCHMARK'):
+    benchmark.enable(sphinx_gallery_conf)
+
 html_theme_options = {
     'navigation_depth': 2,
 }
 
 # the following lines suppress INFO messages when files are downloaded using geocat.datafiles
-import geocat.datafiles
 import logging
 import pooch
 logger = pooch.get_logger()
 logger.setLevel(logging.WARNING)
-geocat.datafiles.get("registry.txt")
+if os.environ.get('GALLERY_DATAFILES_MIRROR'):
+    # Offline build: the mirror is the datafiles cache and holds the registry
+    datafiles.import_offline(os.environ['GALLERY_DATAFILES_MIRROR'])
+else:
+    import geocat.datafiles
+    geocat.datafiles.get("registry.txt")
+
+
+# -- Gallery build hooks -----------------------------------------------------
+
+
+def setup(app):
+    # Fetch every geocat.datafiles input up front, concurrently
+    app.connect('builder-inited', datafiles.prefetch_stage, priority=300)
+    # Restore cached example output after sphinx-gallery has read its
+    # configuration but before it generates the gallery (priority 500)
+    app.connect('builder-inited', build_cache.restore_outputs, priority=400)
+    app.connect('build-finished', build_cache.store_outputs)
+    app.connect('build-finished', dataset_cache.report)
+    if os.environ.get('GALLERY_BENCHMARK'):
+        app.connect('builder-inited', benchmark.clear_records, priority=400)
+        app.connect('build-finished', benchmark.write_report)
@@ -0,0 +1,8 @@
+"""
+Helpers shared by the GeoCAT-examples gallery.
+
+Most modules hook into the Sphinx build and are imported from ``conf.py``.
+Others hold plotting utilities used by several example scripts; those
+scripts need the root of this repository on ``sys.path`` (the gallery build
+adds it, otherwise run them with ``PYTHONPATH=/path/to/GeoCAT-examples``).
+"""
@@ -0,0 +1,274 @@
+"""
+Per-example execution benchmarks for the gallery build.
+
+When the build is run with the ``GALLERY_BENCHMARK`` environment variable
+set, every executed example records its wall time, CPU time, peak resident
+memory, number of figures and the bytes of ``geocat.datafiles`` inputs it
+fetched. The measurements are taken inside whichever process runs the
+example (including the workers of a parallel build) and written as one JSON
+file per example; at the end of the build they are combined into
+``benchmark.json`` and ``benchmark.csv`` and compared against a baseline
+report, if ``GALLERY_BENCHMARK_BASELINE`` names one.
+
+Examples restored from the build cache are not executed, so they do not
+appear in the report.
+
+A report can also be compared against a baseline from the command line::
+
+    python -m gallery_tools.benchmark report.json baseline.json
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+
+FIELDS = ('example', 'wall_time', 'cpu_time', 'peak_rss', 'figures',
+          'datafiles', 'datafile_bytes')
+
+# A measurement regresses when it grows by more than the relative tolerance
+# *and* by more than the absolute one, so that noise on fast examples is
+# not reported
+TOLERANCES = {
+    'wall_time': (0.25, 0.5),  # seconds
+    'cpu_time': (0.25, 0.5),  # seconds
+    'peak_rss': (0.20, 50 * 2**20),  # bytes
+}
+
+# State of the example that is currently running in this process
+_current = {}
+
+
+def report_dir():
+    """Directory the per-example records and the reports are written to."""
+
+    return os.environ.get('GALLERY_BENCHMARK_DIR',
+                          os.path.abspath(os.path.join('_build', 'benchmark')))
+
+
+def enable(gallery_conf):
+    """
+    Add the benchmark hooks to a ``sphinx_gallery_conf`` dictionary.
+
+    Args:
+        gallery_conf (:class:`dict`):
+            The sphinx-gallery configuration from ``conf.py``.
+    """
+
+    # Worker processes only see the environment, so pin the directory now
+    os.environ['GALLERY_BENCHMARK_DIR'] = report_dir()
+    gallery_conf['reset_modules'] = tuple(
+        gallery_conf.get('reset_modules',
+                         ('matplotlib', 'seaborn'))) + (__name__ + '.measure',)
+    gallery_conf['reset_modules_order'] = 'both'
+    gallery_conf['image_scrapers'] = (__name__ + '.matplotlib_scraper',)
+
+
+def measure(gallery_conf, fname, when):
+    """
+    sphinx-gallery ``reset_modules`` hook that starts measuring an example
+    before it runs and writes its record after it ran.
+    """
+
+    if fname is None:
+        return
+    if when == 'before':
+        _start(fname)
+    elif _current.get('example') == os.path.basename(fname):
+        _finish()
+
+
+def matplotlib_scraper(block, block_vars, gallery_conf, **kwargs):
+    """sphinx-gallery's matplotlib scraper, counting the figures it saves."""
+
+    import matplotlib.pyplot as plt
+    from sphinx_gallery.scrapers import matplotlib_scraper
+
+    if _current:
+        _current['figures'] += len(plt.get_fignums())
+    return matplotlib_scraper(block, block_vars, gallery_conf, **kwargs)
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS of this process; only possible on Linux."""
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes."""
+
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Peak over the whole life of the process; kB on Linux, bytes on macOS
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _start(fname):
+    import geocat.datafiles as gdf
+
+    get = gdf.get
+    fetched = {}
+
+    def counting_get(path, *args, **kwargs):
+        local = get(path, *args, **kwargs)
+        fetched[path] = os.path.getsize(local)
+        return local
+
+    gdf.get = counting_get
+    _reset_peak_rss()
+    _current.update(example=os.path.basename(fname),
+                    figures=0,
+                    fetched=fetched,
+                    get=get,
+                    wall=time.perf_counter(),
+                    cpu=time.process_time())
+
+
+def _finish():
+    import geocat.datafiles as gdf
+
+    wall = time.perf_counter() - _current['wall']
+    cpu = time.process_time() - _current['cpu']
+    gdf.get = _current['get']
+    record = {
+        'example': _current['example'],
+        'wall_time': round(wall, 3),
+        'cpu_time': round(cpu, 3),
+        'peak_rss': _peak_rss(),
+        'figures': _current['figures'],
+        'datafiles': len(_current['fetched']),
+        'datafile_bytes': sum(_current['fetched'].values()),
+    }
+    _current.clear()
+
+    directory = os.path.join(report_dir(), 'examples')
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, record['example'] + '.json'), 'w') as f:
+        json.dump(record, f)
+
+
+def clear_records(app):
+    """``builder-inited`` handler removing the records of a previous build."""
+
+    directory = os.path.join(report_dir(), 'examples')
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def write_report(app, exception):
+    """
+    ``build-finished`` handler combining the per-example records into
+    ``benchmark.json``/``benchmark.csv`` and flagging regressions.
+    """
+
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+
+    directory = report_dir()
+    records = []
+    if os.path.isdir(os.path.join(directory, 'examples')):
+        for name in sorted(os.listdir(os.path.join(directory, 'examples'))):
+            with open(os.path.join(directory, 'examples', name)) as f:
+                records.append(json.load(f))
+
+    baseline = os.environ.get('GALLERY_BENCHMARK_BASELINE')
+    regressions = compare(records, load(baseline)) if baseline else []
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'benchmark.json'), 'w') as f:
+        report = {'examples': records, 'regressions': regressions}
+        json.dump(report, f, indent=2)
+    with open(os.path.join(directory, 'benchmark.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+    logger.info(f'gallery benchmark: {len(records)} examples written to '
+                f'{directory}')
+    for regression in regressions:
+        logger.warning('gallery benchmark regression: ' +
+                       _describe(regression))
+
+
+def load(path):
+    """
+    Load the per-example records of a ``benchmark.json`` report.
+
+    Args:
+        path (:class:`str`):
+            Path to the report.
+    Returns:
+        records (:class:`list`):
+            One dictionary per example, with the keys in ``FIELDS``.
+    """
+
+    with open(path) as f:
+        return json.load(f)['examples']
+
+
+def compare(records, baseline):
+    """
+    Find the measurements that regressed with respect to a baseline.
+
+    Args:
+        records (:class:`list`):
+            Per-example records of the current build.
+        baseline (:class:`list`):
+            Per-example records of the baseline build.
+    Returns:
+        regressions (:class:`list`):
+            One dictionary per regressed measurement, with the example name,
+            the measurement, and its baseline and current values.
+    """
+
+    previous = {record['example']: record for record in baseline}
+    regressions = []
+    for record in records:
+        old = previous.get(record['example'])
+        if old is None:
+            continue
+        for field, (relative, absolute) in TOLERANCES.items():
+            if (record[field] > old[field] * (1 + relative) and
+                    record[field] - old[field] > absolute):
+                regressions.append({
+                    'example': record['example'],
+                    'field': field,
+                    'baseline': old[field],
+                    'current': record[field],
+                })
+    return regressions
+
+
+def _describe(regression):
+    return (f"{regression['example']} {regression['field']} "
+            f"{regression['baseline']} -> {regression['current']}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print(f'usage: python -m {__spec__.name} REPORT BASELINE')
+        return 2
+    regressions = compare(load(argv[0]), load(argv[1]))
+    for regression in regressions:
+        print(_describe(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Persistent, content-addressed cache of the gallery output of each example.
+
+sphinx-gallery already skips an example whose source did not change since
+the last build in the same checkout. This cache extends that in two ways:
+
+- An example is re-run when one of its ``geocat.datafiles`` inputs or one of
+  the libraries used to render it changed, even if its source did not.
+- The generated rst, images, notebook and downloads are kept in a directory
+  outside of the gallery (``.gallery_cache`` by default, or the
+  ``GALLERY_CACHE_DIR`` environment variable), so a fresh checkout or a
+  cleaned gallery is restored from it instead of re-executing everything.
+
+Entries are keyed on the hash of the script source and of the
+``gallery_tools`` modules it imports, the hashes of every file it fetches
+through ``geocat.datafiles.get`` and the versions of the libraries below.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+from importlib import metadata
+
+from sphinx.util import logging
+
+from .datafiles import datafile_hash, find_datafiles, local_modules
+
+logger = logging.getLogger(__name__)
+
+# Distributions whose version can change what an example draws
+LIBRARIES = ('cartopy', 'geocat.comp', 'geocat.datafiles', 'geocat.viz',
+             'matplotlib', 'metpy', 'netCDF4', 'numpy', 'pandas', 'pyshp',
+             'scikit-learn', 'scipy', 'shapely', 'sphinx-gallery',
+             'wrf-python', 'xarray')
+
+
+def cache_dir(srcdir):
+    """Directory the cache entries live in."""
+
+    return os.environ.get('GALLERY_CACHE_DIR',
+                          os.path.join(srcdir, '.gallery_cache'))
+
+
+def library_versions():
+    """
+    Get the versions of the libraries the gallery output depends on.
+
+    Returns:
+        versions (:class:`dict`):
+            Mapping of distribution name to version string, ``None`` for
+            distributions that are not installed.
+    """
+
+    versions = {'python': sys.version.split()[0]}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def example_key(src_file, versions):
+    """
+    Compute the cache key of an example.
+
+    Args:
+        src_file (:class:`str`):
+            Path to the example script.
+        versions (:class:`dict`):
+            Output of :func:`library_versions`.
+    Returns:
+        key (:class:`str`):
+            Hex digest identifying the example's output.
+    """
+
+    sha = hashlib.sha256()
+    for source in [src_file] + local_modules(src_file):
+        with open(source, 'rb') as f:
+            sha.update(f.read())
+    for path in find_datafiles(src_file):
+        sha.update(f'\0{path}={datafile_hash(path)}'.encode())
+    for name, version in sorted(versions.items()):
+        sha.update(f'\0{name}=={version}'.encode())
+    return sha.hexdigest()
+
+
+def output_files(target_file):
+    """
+    List the files sphinx-gallery generated for one example.
+
+    Args:
+        target_file (:class:`str`):
+            Path of the example's copy in the gallery directory.
+    Returns:
+        files (:class:`list`):
+            Paths relative to the directory of ``target_file``.
+    """
+
+    target_dir, fname = os.path.split(target_file)
+    stem = os.path.splitext(fname)[0]
+    patterns = (
+        ('', re.compile(re.escape(stem) + r'\.')),
+        ('images',
+         re.compile(r'sphx_glr_' + re.escape(stem) + r'_\d{3}\.\w+$')),
+        (os.path.join('images', 'thumb'),
+         re.compile(r'sphx_glr_' + re.escape(stem) + r'_thumb\.\w+$')),
+    )
+
+    files = []
+    for subdir, pattern in patterns:
+        directory = os.path.join(target_dir, subdir)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if pattern.match(name) and os.path.isfile(
+                    os.path.join(directory, name)):
+                files.append(os.path.join(subdir, name))
+    return files
+
+
+def _examples(app):
+    """Yield ``(src_file, target_file)`` for every executable example."""
+
+    gallery_conf = app.config.sphinx_gallery_conf
+    pattern = re.compile(gallery_conf['filename_pattern'])
+    for examples_dir, gallery_dir in zip(gallery_conf['examples_dirs'],
+                                         gallery_conf['gallery_dirs']):
+        examples_dir = os.path.join(app.srcdir, examples_dir)
+        gallery_dir = os.path.join(app.srcdir, gallery_dir)
+        for root, _, files in os.walk(examples_dir):
+            for fname in sorted(files):
+                src_file = os.path.normpath(os.path.join(root, fname))
+                if not fname.endswith('.py') or not pattern.search(src_file):
+                    continue
+                rel = os.path.relpath(src_file, examples_dir)
+                yield src_file, os.path.join(gallery_dir, rel)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def restore_outputs(app):
+    """
+    ``builder-inited`` handler: make the gallery directory reflect the cache
+    before sphinx-gallery decides which examples to run.
+
+    Examples whose outputs on disk were built under the current key are left
+    alone, cached ones are copied back, and the rest get their ``.md5`` file
+    removed so sphinx-gallery executes them again.
+    """
+
+    if not app.config.sphinx_gallery_conf.get('plot_gallery', True):
+        return
+
+    root = cache_dir(app.srcdir)
+    versions = library_versions()
+    hits = misses = 0
+    for src_file, target_file in _examples(app):
+        key = example_key(src_file, versions)
+        if _read(target_file + '.cachekey') == key:
+            continue
+
+        entry = os.path.join(root, key)
+        if os.path.isdir(entry):
+            target_dir = os.path.dirname(target_file)
+            for rel in output_files(os.path.join(entry,
+                                                 os.path.basename(target_file))):
+                dest = os.path.join(target_dir, rel)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.copy2(os.path.join(entry, rel), dest)
+            hits += 1
+        else:
+            for suffix in ('.md5', '.cachekey'):
+                if os.path.exists(target_file + suffix):
+                    os.remove(target_file + suffix)
+            misses += 1
+
+    logger.info(f'gallery build cache: {hits} restored, {misses} to run')
+
+
+def store_outputs(app, exception):
+    """
+    ``build-finished`` handler: copy the outputs of every example that ran
+    successfully in this build into the cache.
+    """
+
+    gallery_conf = app.config.sphinx_gallery_conf
+    if exception is not None or not gallery_conf.get('plot_gallery', True):
+        return
+
+    passing = {os.path.normpath(f) for f in gallery_conf['passing_examples']}
+    root = cache_dir(app.srcdir)
+    os.makedirs(root, exist_ok=True)
+    versions = library_versions()
+    for src_file, target_file in _examples(app):
+        if src_file not in passing:
+            continue
+        key = example_key(src_file, versions)
+        with open(target_file + '.cachekey', 'w') as f:
+            f.write(key)
+
+        # Populate a temporary directory and rename it, so an interrupted
+        # build never leaves a partial entry behind
+        entry = os.path.join(root, key)
+        tmp = tempfile.mkdtemp(dir=root)
+        target_dir = os.path.dirname(target_file)
+        for rel in output_files(target_file):
+            dest = os.path.join(tmp, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(os.path.join(target_dir, rel), dest)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
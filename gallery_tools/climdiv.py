@@ -0,0 +1,386 @@
+"""
+Batched rendering of the NCDC climate division precipitation data used by
+NCL_polyg_2 (``climdiv_prcp_1899-1999.nc``).
+
+In that file every climate division is its own data variable: a monthly
+precipitation time series with the outline of the division in ``lat`` and
+``lon``. Here the time series of all divisions are stacked into one 2D array
+and the outlines into one vertex array, so any statistic is a single NumPy
+reduction over the stack and all divisions are drawn, projected once, as one
+collection whose colors can be swapped to show another period.
+
+The same collection drives an animation of the monthly record: the figure
+is built once and every frame only changes the face colors before it is
+handed to a frame writer (a matplotlib movie writer, or PNGSequenceWriter
+for one image per frame). The same way, save_yearly_maps saves a map of the
+total precipitation of every year of the record::
+
+    python -m gallery_tools.climdiv polyg_2.mp4
+    python -m gallery_tools.climdiv 'frames/polyg_2_{frame:04d}.png'
+    python -m gallery_tools.climdiv --yearly 'years/polyg_2_{year}.png'
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+from matplotlib import animation
+from matplotlib.collections import PathCollection
+
+from .natural_earth import projected_geometries
+from .shapes import project_polygons
+
+
+def read_divisions(ds):
+    """
+    Utility function to stack the climate divisions of a data set.
+
+    Args:
+        ds (:class:`xarray.Dataset`):
+            Climate division data set. Data variables without a 'state_name' attribute are skipped.
+    Returns:
+        names (:class:`list`):
+            Names of the division variables, in the order of the stacked arrays.
+        precipitation (:class:`numpy.ndarray`):
+            Monthly precipitation with shape (division, month).
+        vertices (:class:`numpy.ndarray`):
+            (lon, lat) of the outlines of all divisions, stacked in one array of shape (npoints, 2).
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every division.
+    """
+
+    divisions = [(name, da)
+                 for name, da in ds.data_vars.items()
+                 if hasattr(da, 'state_name')]
+    names = [name for name, _ in divisions]
+    precipitation = np.stack([da.values for _, da in divisions])
+
+    outlines = [
+        np.column_stack((np.asarray(da.lon, dtype='float64'),
+                         np.asarray(da.lat, dtype='float64')))
+        for _, da in divisions
+    ]
+    counts = np.array([len(outline) for outline in outlines], dtype='int64')
+    parts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    return names, precipitation, np.concatenate(outlines), parts
+
+
+def annual_totals(precipitation):
+    """
+    Utility function to sum monthly precipitation into yearly totals.
+
+    Args:
+        precipitation (:class:`numpy.ndarray`):
+            Monthly precipitation with shape (division, month), starting in January.
+            Months after the last full year are ignored.
+    Returns:
+        totals (:class:`numpy.ndarray`):
+            Yearly precipitation with shape (division, year).
+    """
+
+    ndiv, nmonths = precipitation.shape
+    nyears = nmonths // 12
+    return precipitation[:, :nyears * 12].reshape(ndiv, nyears, 12).sum(axis=2)
+
+
+def classify(values, colorbounds):
+    """
+    Utility function to find the color of every value at once.
+
+    Args:
+        values (:class:`numpy.ndarray`):
+            Data values, of any shape.
+        colorbounds (:class:`list`):
+            Bounds of the colors, one item longer than the colormap.
+    Returns:
+        index (:class:`numpy.ndarray`):
+            Index into the colormap colors for every value. As in NCL_polyg_2's
+            original findDivColor, values below the first bound or at or above
+            the last one (and NaNs) get the last color.
+    """
+
+    # Index is 'x-1' because colorbounds is one item longer than the colormap
+    index = np.digitize(values, colorbounds) - 1
+    last = len(colorbounds) - 2
+    return np.where((index < 0) | (index > last), last, index)
+
+
+def division_collection(vertices, parts, proj, transform=None, **kwargs):
+    """
+    Utility function to draw the outlines of all divisions as one projected collection.
+
+    Args:
+        vertices (:class:`numpy.ndarray`):
+            Stacked outlines, as returned by read_divisions.
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every division.
+        proj (:class:`cartopy.crs`):
+            Projection of the axes the collection will be added to.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of the outlines.
+            Default is ccrs.PlateCarree().
+        kwargs:
+            Passed on to :class:`matplotlib.collections.PathCollection` (ex. facecolors, edgecolor).
+    Returns:
+        collection (:class:`matplotlib.collections.PathCollection`):
+            Collection with one path per division, to be added with ax.add_collection.
+            Call set_facecolor on it to recolor the divisions.
+    """
+
+    return PathCollection(project_polygons(vertices, parts, proj, transform),
+                          **kwargs)
+
+
+def save_yearly_maps(fig,
+                     collection,
+                     totals,
+                     colormap,
+                     colorbounds,
+                     filename,
+                     first_year=1899,
+                     label_artist=None,
+                     dpi=None):
+    """
+    Utility function to save one map per year by recoloring an existing figure.
+
+    The figure is drawn once per year without being rebuilt: only the face colors of the
+    division collection change between the saved maps.
+
+    Args:
+        fig (:class:`matplotlib.figure.Figure`):
+            Figure holding the division collection.
+        collection (:class:`matplotlib.collections.PathCollection`):
+            Collection returned by division_collection.
+        totals (:class:`numpy.ndarray`):
+            Yearly precipitation with shape (division, year), as returned by annual_totals.
+        colormap (:class:`matplotlib.colors.ListedColormap`):
+            Colors of the divisions.
+        colorbounds (:class:`list`):
+            Bounds of the colors, one item longer than the colormap.
+        filename (:class:`str`):
+            Name of the saved files, with a '{year}' field (ex. 'polyg_2_{year}.png').
+        first_year (:class:`int`):
+            Year of the first column of 'totals'. Default first_year is 1899.
+        label_artist (:class:`matplotlib.text.Text`):
+            Optional text artist showing the year of every map.
+        dpi (:class:`float`):
+            Resolution of the maps. Defaults to the figure's dpi.
+    Returns:
+        filenames (:class:`list`):
+            Names of the saved files.
+    """
+
+    # Classify every division in every year with one call
+    index = classify(totals, colorbounds)
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    filenames = []
+    for year in range(totals.shape[1]):
+        collection.set_facecolor(colormap(index[:, year]))
+        if label_artist is not None:
+            label_artist.set_text(str(first_year + year))
+        filenames.append(filename.format(year=first_year + year))
+        fig.savefig(filenames[-1], dpi=dpi)
+    return filenames
+
+
+class PNGSequenceWriter(animation.AbstractMovieWriter):
+    """
+    Frame writer saving every frame as its own image. The output file name needs a '{frame}'
+    field (ex. 'frames/polyg_2_{frame:04d}.png') that is filled in with the frame number.
+    """
+
+    def setup(self, fig, outfile, dpi=None):
+        directory = os.path.dirname(outfile)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().setup(fig, outfile, dpi=dpi)
+        self._frame = 0
+
+    def grab_frame(self, **savefig_kwargs):
+        self.fig.savefig(self.outfile.format(frame=self._frame),
+                         dpi=self.dpi,
+                         **savefig_kwargs)
+        self._frame += 1
+
+    def finish(self):
+        pass
+
+
+def animate(fig,
+            collection,
+            values,
+            colormap,
+            colorbounds,
+            writer,
+            outfile,
+            labels=None,
+            label_artist=None,
+            dpi=None):
+    """
+    Utility function to stream an animation of the divisions to a frame writer.
+
+    Nothing in the figure is rebuilt between frames: only the face colors of the division collection
+    (and the text of 'label_artist') change, so memory use does not grow with the number of frames.
+
+    Args:
+        fig (:class:`matplotlib.figure.Figure`):
+            Figure holding the division collection.
+        collection (:class:`matplotlib.collections.PathCollection`):
+            Collection returned by division_collection.
+        values (:class:`numpy.ndarray`):
+            Data with shape (division, frame) (ex. the monthly precipitation from read_divisions).
+        colormap (:class:`matplotlib.colors.ListedColormap`):
+            Colors of the divisions.
+        colorbounds (:class:`list`):
+            Bounds of the colors, one item longer than the colormap.
+        writer (:class:`matplotlib.animation.AbstractMovieWriter`):
+            Frame writer (ex. matplotlib.animation.FFMpegWriter(fps=12) or PNGSequenceWriter()).
+        outfile (:class:`str`):
+            File the writer writes to.
+        labels (:class:`list`):
+            Optional text shown in 'label_artist' for every frame (ex. the month).
+        label_artist (:class:`matplotlib.text.Text`):
+            Text artist updated with the label of every frame.
+        dpi (:class:`float`):
+            Resolution of the frames. Defaults to the figure's dpi.
+    """
+
+    # Classify every division in every frame with one call; the colors of
+    # a frame are only looked up when it is drawn
+    index = classify(values, colorbounds)
+
+    with writer.saving(fig, outfile, dpi):
+        for frame in range(values.shape[1]):
+            collection.set_facecolor(colormap(index[:, frame]))
+            if labels is not None and label_artist is not None:
+                label_artist.set_text(labels[frame])
+            writer.grab_frame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'python -m {__spec__.name}',
+        description='Animate the monthly precipitation of the NCDC climate '
+        'divisions, as mapped by NCL_polyg_2, or map their yearly totals.')
+    parser.add_argument('outfile',
+                        help="movie file (ex. polyg_2.mp4), or image files "
+                        "with a '{frame}' field for one image per frame, or "
+                        "with a '{year}' field for --yearly")
+    parser.add_argument('--yearly',
+                        action='store_true',
+                        help='save one map of the total precipitation of '
+                        'every year instead of animating the months')
+    parser.add_argument('--fps', type=int, default=12)
+    parser.add_argument('--dpi', type=float, default=100)
+    parser.add_argument('--frames',
+                        type=int,
+                        default=None,
+                        help='only draw the first FRAMES months (or years '
+                        'with --yearly)')
+    args = parser.parse_args(argv)
+    if args.yearly and '{year' not in args.outfile:
+        parser.error("--yearly needs a '{year}' field in OUTFILE")
+
+    import cartopy.crs as ccrs
+    import geocat.datafiles as gdf
+    import matplotlib.colors as colors
+    import matplotlib.pyplot as plt
+    import xarray as xr
+
+    ds = xr.open_dataset(gdf.get("netcdf_files/climdiv_prcp_1899-1999.nc"),
+                         decode_times=False)
+    _, precipitation, vertices, parts = read_divisions(ds)
+
+    # Same colors as NCL_polyg_2, with its bounds for yearly precipitation,
+    # or bounds for monthly precipitation
+    colormap = colors.ListedColormap([
+        'mediumpurple', 'mediumblue', 'royalblue', 'cornflowerblue',
+        'lightblue', 'lightseagreen', 'yellowgreen', 'green', 'wheat', 'tan',
+        'gold', 'orange', 'red', 'firebrick'
+    ])
+    if args.yearly:
+        totals = annual_totals(precipitation)[:, :args.frames]
+        colorbounds = [0, 5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80, 90,
+                       100]
+    else:
+        precipitation = precipitation[:, :args.frames]
+        labels = [
+            f'{1899 + month // 12}-{month % 12 + 1:02d}'
+            for month in range(precipitation.shape[1])
+        ]
+        colorbounds = [0, .5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10]
+
+    fig = plt.figure(figsize=(8, 6))
+    ax = plt.axes([.05, .1, .9, .85],
+                  projection=ccrs.LambertConformal(),
+                  frameon=False)
+    ax.set_extent([-119, -74, 18, 50], ccrs.Geodetic())
+    states, _ = projected_geometries('cultural',
+                                     'admin_1_states_provinces_lakes_shp',
+                                     '110m',
+                                     ax.projection,
+                                     extent=[-119, -74, 18, 50])
+    ax.add_geometries(states,
+                      ax.projection,
+                      facecolor='white',
+                      edgecolor='black')
+    divisions = division_collection(vertices,
+                                    parts,
+                                    ax.projection,
+                                    edgecolor='black',
+                                    linewidths=.5,
+                                    zorder=2)
+    ax.add_collection(divisions, autolim=False)
+    label = ax.set_title('', fontsize=16)
+
+    cax = fig.add_axes([.15, .07, .7, .03])
+    fig.colorbar(plt.cm.ScalarMappable(cmap=colormap,
+                                       norm=colors.BoundaryNorm(
+                                           colorbounds, colormap.N)),
+                 cax=cax,
+                 boundaries=colorbounds,
+                 ticks=colorbounds,
+                 spacing='uniform',
+                 orientation='horizontal',
+                 label='inches')
+
+    if args.yearly:
+        filenames = save_yearly_maps(fig,
+                                     divisions,
+                                     totals,
+                                     colormap,
+                                     colorbounds,
+                                     args.outfile,
+                                     label_artist=label,
+                                     dpi=args.dpi)
+        print(f'{len(filenames)} yearly maps written')
+        return
+
+    if '{frame' in args.outfile:
+        writer = PNGSequenceWriter(fps=args.fps)
+    elif args.outfile.endswith('.gif'):
+        writer = animation.PillowWriter(fps=args.fps)
+    else:
+        writer = animation.FFMpegWriter(fps=args.fps)
+
+    animate(fig,
+            divisions,
+            precipitation,
+            colormap,
+            colorbounds,
+            writer,
+            args.outfile,
+            labels=labels,
+            label_artist=label,
+            dpi=args.dpi)
+    print(f'{precipitation.shape[1]} frames written to {args.outfile}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,495 @@
+"""
+Utilities for finding, prefetching and indexing the ``geocat.datafiles``
+inputs of the example scripts.
+
+Before the gallery is generated, every path passed to ``gdf.get(...)`` in
+the examples is fetched into the local ``geocat.datafiles`` cache by a pool
+of threads, checked against the registry hashes, and recorded in an index
+file. Example scripts then resolve ``gdf.get`` through that index with a
+dictionary lookup instead of having pooch hash the file on every call.
+
+Setting ``GALLERY_DATAFILES_MIRROR`` to a directory laid out like the
+GeoCAT-datafiles repository (e.g. a clone of it) makes that directory the
+``geocat.datafiles`` cache, with its ``registry.txt`` as the registry (see
+import_offline), so the build can run offline.
+
+The same stage can be run on its own::
+
+    python -m gallery_tools.datafiles [--mirror DIR] [--jobs N] [PATH ...]
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pooch
+
+INDEX_NAME = 'gallery_index.json'
+
+# Index loaded by use_index in this process, path -> local file
+_index = None
+
+
+def find_datafiles(script):
+    """
+    Statically collect the paths an example script passes to
+    ``geocat.datafiles.get``. The script is parsed, not executed, so only
+    paths built from string literals (or module level names bound to string
+    literals, e.g. ``gdf.get('netcdf_files/' + filename)``) are found.
+
+    The ``gallery_tools`` modules the script imports are searched as well.
+    Modules that fetch files through paths computed at run time list them in
+    a module level ``DATAFILES`` tuple of string literals instead.
+
+    Args:
+        script (:class:`str`):
+            Path to the example script.
+    Returns:
+        paths (:class:`list`):
+            Sorted list of the distinct datafile paths, e.g.
+            ``['netcdf_files/uv300.nc']``.
+    """
+
+    paths = set()
+    for source in [script] + local_modules(script):
+        paths.update(_source_datafiles(source))
+    return sorted(paths)
+
+
+def local_modules(script):
+    """
+    Find the ``gallery_tools`` modules a script imports, directly or through
+    other ``gallery_tools`` modules.
+
+    Args:
+        script (:class:`str`):
+            Path to the example script.
+    Returns:
+        modules (:class:`list`):
+            Sorted list of the paths of the module files.
+    """
+
+    found = set()
+    pending = [os.path.abspath(script)]
+    while pending:
+        for module in _imported_modules(pending.pop()):
+            if module not in found:
+                found.add(module)
+                pending.append(module)
+    return sorted(found)
+
+
+def _imported_modules(source):
+    """Files of the gallery_tools modules imported by one source file."""
+
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(source, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=source)
+    in_package = os.path.dirname(os.path.abspath(source)) == package_dir
+
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if not in_package:
+                    continue
+                base = __package__ + ('.' + node.module if node.module else '')
+            else:
+                base = node.module
+            names.append(base)
+            names += [base + '.' + alias.name for alias in node.names]
+
+    modules = set()
+    for name in names:
+        parts = name.split('.')
+        if parts[0] != __package__ or len(parts) > 2:
+            continue
+        module = os.path.join(package_dir, (parts[1:] or ['__init__'])[0] +
+                              '.py')
+        if os.path.exists(module):
+            modules.add(module)
+    return modules
+
+
+def _source_datafiles(source):
+    """Datafile paths found in one source file, see find_datafiles."""
+
+    with open(source, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=source)
+
+    # Names under which geocat.datafiles (or its get function) is reachable
+    modules = {'geocat.datafiles'}
+    functions = set()
+    # Module level names bound to something that resolves to a string
+    constants = {}
+    paths = set()
+
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == 'geocat.datafiles':
+                    modules.add(alias.asname or alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if node.module == 'geocat' and alias.name == 'datafiles':
+                    modules.add(alias.asname or alias.name)
+                elif node.module == 'geocat.datafiles' and alias.name == 'get':
+                    functions.add(alias.asname or alias.name)
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and
+              isinstance(node.targets[0], ast.Name)):
+            if node.targets[0].id == 'DATAFILES' and isinstance(
+                    node.value, (ast.Tuple, ast.List)):
+                for element in node.value.elts:
+                    path = _resolve_string(element, constants)
+                    if path is not None:
+                        paths.add(path)
+            value = _resolve_string(node.value, constants)
+            if value is not None:
+                constants[node.targets[0].id] = value
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        func = node.func
+        if isinstance(func, ast.Name):
+            is_get = func.id in functions
+        elif isinstance(func, ast.Attribute) and func.attr == 'get':
+            is_get = _dotted_name(func.value) in modules
+        else:
+            is_get = False
+        if is_get:
+            path = _resolve_string(node.args[0], constants)
+            if path is not None:
+                paths.add(path)
+
+    return paths
+
+
+def datafile_hash(path):
+    """
+    Get the SHA256 hash of a ``geocat.datafiles`` input. The hash recorded
+    in the registry is used when there is one, so the file does not have to
+    be downloaded; otherwise the file is fetched and hashed.
+
+    Args:
+        path (:class:`str`):
+            Datafile path as passed to ``geocat.datafiles.get``.
+    Returns:
+        sha256 (:class:`str`):
+            Hex digest of the file contents.
+    """
+
+    import geocat.datafiles as gdf
+
+    known_hash = _registry_hash(gdf.POOCH.registry, path)
+    if known_hash:
+        return known_hash
+    return pooch.file_hash(gdf.get(path))
+
+
+def import_offline(mirror):
+    """
+    Import ``geocat.datafiles`` without network access, reading everything
+    from a local mirror of the GeoCAT-datafiles repository.
+
+    The mirror becomes the pooch cache (through ``GEOCAT_DATA_DIR``), and
+    the check of the remote registry that ``geocat.datafiles`` makes when it
+    is imported is answered with the mirror's ``registry.txt``. It has to be
+    called before anything else imports ``geocat.datafiles`` in the process:
+    conf.py calls it in the main Sphinx process and use_index in every
+    worker process of a parallel build.
+
+    Args:
+        mirror (:class:`str`):
+            Directory holding ``registry.txt`` and the datafiles under the
+            same relative paths.
+    Returns:
+        gdf (:class:`module`):
+            The ``geocat.datafiles`` module.
+    """
+
+    import types
+
+    import requests
+
+    os.environ['GEOCAT_DATA_DIR'] = os.path.abspath(mirror)
+    registry = os.path.join(mirror, 'registry.txt')
+    get = requests.get
+
+    def mirrored_get(url, *args, **kwargs):
+        if url.endswith('/registry.txt'):
+            with open(registry, 'rb') as f:
+                return types.SimpleNamespace(content=f.read())
+        return get(url, *args, **kwargs)
+
+    requests.get = mirrored_get
+    try:
+        import geocat.datafiles as gdf
+    finally:
+        requests.get = get
+    return gdf
+
+
+def index_path():
+    """Location of the datafile index, next to the downloaded files."""
+
+    import geocat.datafiles as gdf
+
+    return os.environ.get('GALLERY_DATAFILES_INDEX',
+                          os.path.join(gdf.POOCH.abspath, INDEX_NAME))
+
+
+def prefetch(paths, mirror=None, jobs=8):
+    """
+    Make sure the given datafiles are in the local ``geocat.datafiles``
+    cache with the expected contents, and write the index.
+
+    Files already listed in the index with an unchanged size, modification
+    time and registry hash are not read again. Other files are verified
+    against the registry and fetched (or copied from ``mirror``) when they
+    are missing or do not match.
+
+    Args:
+        paths (:class:`list`):
+            Datafile paths as passed to ``geocat.datafiles.get``.
+        mirror (:class:`str`):
+            Optional directory holding the datafiles under the same relative
+            paths. When given, nothing is downloaded.
+        jobs (:class:`int`):
+            Number of files fetched and verified concurrently.
+    Returns:
+        index (:class:`dict`):
+            The index that was written, mapping each path to its local file,
+            hash, size and modification time.
+    """
+
+    import geocat.datafiles as gdf
+
+    registry = dict(gdf.POOCH.registry)
+    if mirror is not None and os.path.exists(
+            os.path.join(mirror, 'registry.txt')):
+        # Offline, the mirror's registry is the most recent one available
+        gdf.POOCH.load_registry(os.path.join(mirror, 'registry.txt'))
+        registry = dict(gdf.POOCH.registry)
+
+    previous = _read_index(index_path())
+
+    def fetch(path):
+        known_hash = _registry_hash(registry, path)
+        local = os.path.join(gdf.POOCH.abspath, path)
+        entry = previous.get(path)
+        if entry is not None and entry['sha256'] == known_hash and _unchanged(
+                entry):
+            return path, entry
+
+        if not (os.path.exists(local) and
+                (known_hash is None or pooch.file_hash(local) == known_hash)):
+            if mirror is None:
+                local = gdf.POOCH.fetch(path)
+            else:
+                _copy_verified(os.path.join(mirror, path), local, known_hash)
+        stat = os.stat(local)
+        return path, {
+            'local': os.path.abspath(local),
+            'sha256': known_hash or pooch.file_hash(local),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+        }
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        index = dict(executor.map(fetch, sorted(set(paths))))
+
+    # Keep what earlier runs indexed for scripts that were not scanned now
+    merged = {path: entry for path, entry in previous.items() if _unchanged(entry)}
+    merged.update(index)
+    _write_index(index_path(), merged)
+    return index
+
+
+def prefetch_stage(app):
+    """
+    ``builder-inited`` handler running :func:`prefetch` over every example
+    of the gallery before any of them executes.
+    """
+
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+
+    gallery_conf = app.config.sphinx_gallery_conf
+    if not gallery_conf.get('plot_gallery', True):
+        return
+    scripts = []
+    for examples_dir in gallery_conf['examples_dirs']:
+        scripts += glob.glob(os.path.join(app.srcdir, examples_dir, '**',
+                                          '*.py'),
+                             recursive=True)
+    index = prefetch(scan(scripts),
+                     mirror=os.environ.get('GALLERY_DATAFILES_MIRROR'),
+                     jobs=int(os.environ.get('GALLERY_DATAFILES_JOBS', 8)))
+    logger.info(f'prefetched {len(index)} geocat.datafiles inputs')
+
+
+def scan(scripts):
+    """Union of :func:`find_datafiles` over several scripts."""
+
+    paths = set()
+    for script in scripts:
+        paths.update(find_datafiles(script))
+    return sorted(paths)
+
+
+def use_index(gallery_conf, fname):
+    """
+    sphinx-gallery ``reset_modules`` hook making ``geocat.datafiles.get``
+    answer from the index written by :func:`prefetch`. It is installed once
+    per process; paths missing from the index, or whose files changed, still
+    go through pooch. With ``GALLERY_DATAFILES_MIRROR`` set, the worker
+    processes of a parallel build import ``geocat.datafiles`` offline too,
+    see :func:`import_offline`.
+    """
+
+    global _index
+    if _index is not None:
+        return
+
+    mirror = os.environ.get('GALLERY_DATAFILES_MIRROR')
+    if mirror:
+        gdf = import_offline(mirror)
+    else:
+        import geocat.datafiles as gdf
+
+    registry = gdf.POOCH.registry
+    _index = {
+        path: entry['local']
+        for path, entry in _read_index(index_path()).items()
+        if entry['sha256'] == _registry_hash(registry, path) and
+        _unchanged(entry)
+    }
+    get = gdf.get
+
+    def indexed_get(path, *args, **kwargs):
+        local = _index.get(path)
+        if local is None:
+            return get(path, *args, **kwargs)
+        return local
+
+    gdf.get = indexed_get
+
+
+def _registry_hash(registry, path):
+    known_hash = registry.get(path)
+    if not known_hash:
+        return None
+    # pooch allows the registry to prefix hashes with the algorithm name
+    return known_hash.split(':')[-1]
+
+
+def _unchanged(entry):
+    """Whether an index entry still describes the file on disk."""
+
+    try:
+        stat = os.stat(entry['local'])
+    except OSError:
+        return False
+    return stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']
+
+
+def _copy_verified(source, local, known_hash):
+    """Copy a file from a mirror, refusing it if its hash does not match."""
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(f'{source} is not in the datafiles mirror')
+    os.makedirs(os.path.dirname(local), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(local))
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp)
+        if known_hash is not None and pooch.file_hash(tmp) != known_hash:
+            raise ValueError(f'{source} does not match its registry hash')
+        os.replace(tmp, local)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_index(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['files']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _write_index(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'files': files}, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _dotted_name(node):
+    """Turn an ``ast.Name``/``ast.Attribute`` chain into ``'a.b.c'``."""
+
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted_name(node.value)
+        if base is not None:
+            return base + '.' + node.attr
+    return None
+
+
+def _resolve_string(node, constants):
+    """Evaluate a string expression made of literals, known names and +."""
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _resolve_string(node.left, constants)
+        right = _resolve_string(node.right, constants)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'python -m {__spec__.name}',
+        description='Fetch and index the geocat.datafiles inputs of the '
+        'example scripts.')
+    parser.add_argument('paths',
+                        nargs='*',
+                        default=['Plots'],
+                        help='example scripts or directories to scan')
+    parser.add_argument('--mirror',
+                        default=os.environ.get('GALLERY_DATAFILES_MIRROR'),
+                        help='local copy of the datafiles to use offline')
+    parser.add_argument('--jobs', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    scripts = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            scripts += glob.glob(os.path.join(path, '**', '*.py'),
+                                 recursive=True)
+        else:
+            scripts.append(path)
+    if args.mirror:
+        import_offline(args.mirror)
+    index = prefetch(scan(scripts), mirror=args.mirror, jobs=args.jobs)
+    print(f'{len(index)} datafiles indexed in {index_path()}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+In-process cache of the datasets opened by the example scripts.
+
+Many examples read the same files (``uv300.nc``, ``atmos.nc``, the storm
+``.cdf`` files, ...) and each one calls ``xr.open_dataset(gdf.get(...))``
+from scratch. When several examples run in one build process, the
+``use_cache`` hook (see ``conf.py``) makes ``xarray.open_dataset`` keep
+every file it opens, parsed and with its coordinates decoded, keyed by the
+file and the decoding options. Opening the same file with the same options
+again hands out a lightweight view of the stored dataset instead of
+opening and decoding it again.
+
+The stored datasets stay lazy: only their index coordinates are in memory,
+and the values of the data variables are read from the file when an example
+uses them, as with a plain ``xarray.open_dataset``. Every view is a shallow
+copy holding its own lazy variables, so an example can add, drop or rename
+variables, change attributes or load and modify values without the others
+seeing it, and the values it loads are freed with its view.
+
+The cache is a least recently used one bounded by the memory footprint of
+the stored datasets, i.e. of their index coordinates:
+``GALLERY_DATASET_CACHE_BYTES`` bytes (256 MiB by default, 0 disables it).
+The bound applies to every build process, so a parallel build with N
+workers may hold up to N times as much. Calls it cannot key (file objects,
+``chunks``-ed or memory-mapped reads, an explicit ``cache`` option, options
+that are not plain values) go straight to xarray. Hit and miss counts are
+kept per process, see cache_info.
+"""
+
+import collections
+import os
+import threading
+
+# Default bound of the memory footprint of the stored datasets, in bytes
+DEFAULT_MAX_BYTES = 2**28
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'currsize', 'maxbytes'])
+
+# Stored datasets, least recently used first: key -> (dataset, nbytes)
+_datasets = collections.OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+# Guards _datasets and _stats, for loaders opening files from threads
+_lock = threading.Lock()
+
+# xarray.open_dataset as it was before use_cache replaced it
+_open_dataset = None
+
+
+def max_bytes():
+    """Bound of the memory footprint of the stored datasets, in bytes."""
+
+    return int(os.environ.get('GALLERY_DATASET_CACHE_BYTES',
+                              DEFAULT_MAX_BYTES))
+
+
+def open_dataset(filename_or_obj, *args, **kwargs):
+    """
+    Utility function to open a dataset through the cache.
+
+    Args:
+        filename_or_obj (:class:`str`):
+            Path of the file, as passed to xarray.open_dataset. Anything else
+            is passed on uncached.
+        args, kwargs:
+            Passed on to xarray.open_dataset (ex. decode_times=False).
+    Returns:
+        ds (:class:`xarray.Dataset`):
+            Lazy view of the stored dataset.
+    """
+
+    import xarray as xr
+
+    xr_open_dataset = _open_dataset or xr.open_dataset
+    key = _key(filename_or_obj, args, kwargs)
+    if key is None:
+        return xr_open_dataset(filename_or_obj, *args, **kwargs)
+
+    with _lock:
+        if key in _datasets:
+            _datasets.move_to_end(key)
+            _stats['hits'] += 1
+            return _view(_datasets[key][0])
+        _stats['misses'] += 1
+
+    # Without xarray's in-memory cache of loaded values, which the views
+    # would share, the stored dataset never holds more than its indexes
+    stored = xr_open_dataset(filename_or_obj, cache=False, **kwargs)
+    nbytes = _footprint(stored)
+    if nbytes > max_bytes():
+        return _view(stored)
+
+    with _lock:
+        _datasets[key] = (stored, nbytes)
+        total = sum(size for _, size in _datasets.values())
+        while total > max_bytes():
+            _, (_, size) = _datasets.popitem(last=False)
+            total -= size
+            _stats['evictions'] += 1
+    return _view(stored)
+
+
+def cache_info():
+    """
+    Utility function to report how the cache of this process was used.
+
+    Returns:
+        info (:class:`CacheInfo`):
+            Named tuple of the hits, misses and evictions so far, the memory
+            footprint of the stored datasets (currsize) and its bound
+            (maxbytes), both in bytes.
+    """
+
+    return CacheInfo(currsize=sum(size for _, size in _datasets.values()),
+                     maxbytes=max_bytes(),
+                     **_stats)
+
+
+def clear():
+    """Drop the stored datasets and reset the counts."""
+
+    with _lock:
+        _datasets.clear()
+        _stats.update(hits=0, misses=0, evictions=0)
+
+
+def use_cache(gallery_conf, fname):
+    """
+    sphinx-gallery ``reset_modules`` hook making ``xarray.open_dataset``
+    go through the cache. It is installed once per process and does nothing
+    when ``GALLERY_DATASET_CACHE_BYTES`` is 0.
+    """
+
+    global _open_dataset
+    if _open_dataset is not None or max_bytes() <= 0:
+        return
+
+    import xarray as xr
+
+    _open_dataset = xr.open_dataset
+    xr.open_dataset = open_dataset
+
+
+def report(app, exception):
+    """``build-finished`` handler logging the counts of the build process."""
+
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+
+    info = cache_info()
+    if info.hits or info.misses:
+        logger.info(f'dataset cache: {info.hits} hits, {info.misses} misses, '
+                    f'{info.evictions} evictions, '
+                    f'{info.currsize / 2**20:.1f} MiB stored')
+
+
+def _key(filename_or_obj, args, kwargs):
+    """Key of a call, or None when it is not cached."""
+
+    if (args or 'chunks' in kwargs or 'cache' in kwargs or
+            kwargs.get('mmap') or
+            not isinstance(filename_or_obj, (str, os.PathLike))):
+        return None
+    options = []
+    for name, value in sorted(kwargs.items()):
+        if isinstance(value, (list, tuple)):
+            value = tuple(value)
+            plain = all(isinstance(v, (str, int, float)) for v in value)
+        else:
+            plain = value is None or isinstance(value, (str, int, float))
+        if not plain:
+            return None
+        options.append((name, value))
+    try:
+        path = os.path.realpath(filename_or_obj)
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_size, stat.st_mtime_ns, tuple(options)
+
+
+def _footprint(ds):
+    """Bytes a lazily opened dataset holds in memory: its indexes."""
+
+    return sum(ds.variables[name].nbytes for name in ds.xindexes)
+
+
+def _view(ds):
+    """Shallow copy of a stored dataset, with its own lazy variables."""
+
+    return ds.copy(deep=False)
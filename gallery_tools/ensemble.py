@@ -0,0 +1,271 @@
+"""
+Loading of model ensembles stored one member per file, as in NCL_xy_18.
+
+``xr.open_mfdataset(..., preprocess=...)`` opens the members one after the
+other and decodes every file on its own, although the members of an
+ensemble share their time axis. Here the members are opened concurrently,
+undecoded; the time axis is decoded once for all of them (and kept for
+later ensembles with the same axis) and the members are stacked along a
+new ``case`` dimension.
+
+The stacked ensemble can be persisted as a chunked Zarr store (this needs
+the zarr package), keyed by the member files (their size and modification
+time) and the loading options, one chunk per member. Later loads of the
+same ensemble read that store and open no member file at all. Persisting is
+opt-in: pass ``persist=True``, or set the ``GALLERY_ENSEMBLE_PERSIST``
+environment variable to persist every ensemble opened without an explicit
+``persist``. Stores live in ``ensembles`` next to the first member file, or
+in the directory named by the ``GALLERY_ENSEMBLE_CACHE`` environment
+variable.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xarray as xr
+
+# Bump when the layout of the stores changes
+FORMAT_VERSION = 1
+
+# Time axes decoded in this process, keyed by their raw values, units and
+# calendar
+_time_axes = {}
+
+
+def cache_dir(files):
+    """Directory the stores of an ensemble live in."""
+
+    return os.environ.get(
+        'GALLERY_ENSEMBLE_CACHE',
+        os.path.join(os.path.dirname(os.path.abspath(files[0])), 'ensembles'))
+
+
+def open_ensemble(files,
+                  variables=None,
+                  calendar=None,
+                  dim='case',
+                  persist=None,
+                  jobs=None):
+    """
+    Utility function to open the members of an ensemble as one dataset.
+
+    Args:
+        files (:class:`list`):
+            One file per member, in the order of the new dimension.
+        variables (:class:`list`):
+            Optional names of the data variables to keep, ex. ['TREFHT'].
+            Default is all of them.
+        calendar (:class:`str`):
+            Optional calendar of the time axis, ex. 'noleap', replacing the
+            calendar attribute of the files (or filling in for it when it is
+            missing).
+        dim (:class:`str`):
+            Name of the new dimension spanning the members. Default dim is
+            'case'.
+        persist (:class:`bool`):
+            Store the stacked ensemble as a Zarr store and read it from there,
+            see the module documentation. Default is True when
+            GALLERY_ENSEMBLE_PERSIST is set, False otherwise.
+        jobs (:class:`int`):
+            Number of member files opened concurrently. Default is one per
+            file.
+    Returns:
+        ds (:class:`xarray.Dataset`):
+            Dataset with the variables of the members along 'dim', read lazily
+            with dask.
+    """
+
+    if persist is None:
+        persist = bool(os.environ.get('GALLERY_ENSEMBLE_PERSIST'))
+    if not persist:
+        return _stack_members(files, variables, calendar, dim, jobs)
+
+    description = {
+        'version': FORMAT_VERSION,
+        'files': [[os.path.abspath(f),
+                   os.stat(f).st_size,
+                   os.stat(f).st_mtime] for f in files],
+        'variables': None if variables is None else list(variables),
+        'calendar': calendar,
+        'dim': dim,
+    }
+    key = hashlib.sha256(
+        json.dumps(description, sort_keys=True).encode()).hexdigest()
+    store = os.path.join(cache_dir(files), key + '.zarr')
+
+    if not os.path.isdir(store):
+        ds = _stack_members(files, variables, calendar, dim, jobs)
+        _write_store(store, ds, dim)
+    return xr.open_zarr(store, consolidated=False)
+
+
+def decoded_time(time, calendar=None):
+    """
+    Utility function to decode a time coordinate, once per distinct axis.
+
+    Args:
+        time (:class:`xarray.DataArray`):
+            Undecoded time coordinate, as read with decode_times=False.
+        calendar (:class:`str`):
+            Optional calendar replacing the calendar attribute of 'time'.
+    Returns:
+        time (:class:`xarray.DataArray`):
+            Decoded time coordinate. Axes with the same values, units and
+            calendar are decoded once per process.
+    """
+
+    attrs = dict(time.attrs)
+    if calendar is not None:
+        attrs['calendar'] = calendar
+    values = np.asarray(time.values)
+    key = (values.dtype.str, values.tobytes(), attrs.get('units'),
+           attrs.get('calendar'))
+    if key not in _time_axes:
+        raw = xr.Dataset(coords={time.name: (time.dims, values, attrs)})
+        _time_axes[key] = xr.decode_cf(raw)[time.name]
+    return _time_axes[key]
+
+
+def _stack_members(files, variables, calendar, dim, jobs):
+    """Open the members concurrently and stack them along 'dim'."""
+
+    def open_member(path):
+        ds = xr.open_dataset(path, decode_times=False, chunks={})
+        if variables is not None:
+            ds = ds[list(variables)]
+        return ds
+
+    with ThreadPoolExecutor(max_workers=jobs or len(files)) as executor:
+        members = list(executor.map(open_member, files))
+
+    members = [
+        member.assign_coords(time=decoded_time(member.time, calendar))
+        if 'time' in member.coords else member for member in members
+    ]
+    return xr.concat(members, dim=dim, coords='minimal', compat='override')
+
+
+def _write_store(store, ds, dim):
+    root = os.path.dirname(store)
+    os.makedirs(root, exist_ok=True)
+    # Write next to the store and rename it, so readers never see a partial
+    # store
+    tmp = tempfile.mkdtemp(dir=root, suffix='.zarr')
+    try:
+        ds = ds.copy()
+        for variable in ds.variables.values():
+            variable.encoding = {}
+        ds = ds.chunk({name: 1 if name == dim else -1 for name in ds.dims})
+        ds.to_zarr(tmp, mode='w', consolidated=False)
+        os.replace(tmp, store)
+    except OSError:
+        # Another process stored the same ensemble first
+        if not os.path.isdir(store):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def horizontal_weighted_mean(var, weights, lat='lat', lon='lon'):
+    """
+    Utility function to average a field over the globe with latitude weights.
+
+    Args:
+        var (:class:`xarray.DataArray`):
+            Data with latitude and longitude dimensions, and any others
+            (ex. case and time).
+        weights (:class:`xarray.DataArray`):
+            1D weights along the latitude dimension (ex. Gaussian weights).
+        lat, lon (:class:`str`):
+            Names of the latitude and longitude dimensions. Defaults are 'lat'
+            and 'lon'.
+    Returns:
+        mean (:class:`xarray.DataArray`):
+            Weighted mean over latitude and longitude, equal to NCL's
+            wgt_areaave with uniform longitude weights.
+    """
+
+    # The weights are only broadcast along longitude inside one einsum, so no
+    # 2D weight grid is built and the data is read once
+    total = xr.dot(var, weights, dim=[lat, lon])
+    return total / (weights.sum() * var.sizes[lon])
+
+
+def ensemble_statistics(var,
+                        weights,
+                        baseline,
+                        dim='case',
+                        percentiles=None,
+                        lat='lat',
+                        lon='lon'):
+    """
+    Utility function to compute the global mean anomalies of all members of an
+    ensemble and their spread in one pass over the data.
+
+    Args:
+        var (:class:`xarray.DataArray`):
+            Ensemble data with dimensions (dim, time, lat, lon), ex. from
+            open_ensemble.
+        weights (:class:`xarray.DataArray`):
+            1D weights along the latitude dimension.
+        baseline (:class:`slice`):
+            Period the anomalies are measured from, ex. slice('1890', '1920').
+        dim (:class:`str`):
+            Dimension spanning the members. Default dim is 'case'.
+        percentiles (:class:`list`):
+            Optional percentiles of the members to compute as well,
+            ex. [10, 90].
+        lat, lon (:class:`str`):
+            Names of the latitude and longitude dimensions. Defaults are 'lat'
+            and 'lon'.
+    Returns:
+        stats (:class:`xarray.Dataset`):
+            Dataset with the weighted mean anomaly of every member ('anomaly')
+            and the 'min', 'max' and 'mean' of the anomalies over the members,
+            plus 'percentiles' (with a 'percentile' dimension) when percentiles
+            are given. Missing (NaN) members are skipped.
+    """
+
+    # Reduce the fields of all members to global means in one computation;
+    # for dask-backed data it runs over the chunks (ex. one per member) in
+    # parallel. Everything below only handles the small (member, time) array.
+    gav = horizontal_weighted_mean(var, weights, lat, lon).compute()
+    anomaly = gav - gav.sel(time=baseline).mean(dim='time')
+
+    axis = anomaly.get_axis_num(dim)
+    values = anomaly.values
+    # The extremes and the percentiles come out of one quantile computation
+    # over the members. Like xarray's min, max and mean, it skips missing
+    # (NaN) members; times without any member stay NaN, without a warning.
+    q = [0] + [p / 100 for p in (percentiles or [])] + [1]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        quantiles = np.nanquantile(values, q, axis=axis)
+        mean = np.nanmean(values, axis=axis)
+
+    coords = {
+        name: coord
+        for name, coord in anomaly.coords.items()
+        if dim not in coord.dims
+    }
+    dims = [d for d in anomaly.dims if d != dim]
+    stats = xr.Dataset(
+        {
+            'anomaly': anomaly,
+            'min': (dims, quantiles[0]),
+            'max': (dims, quantiles[-1]),
+            'mean': (dims, mean),
+        },
+        coords=coords)
+    if percentiles:
+        stats['percentiles'] = xr.DataArray(
+            quantiles[1:-1],
+            dims=['percentile'] + dims,
+            coords={'percentile': percentiles})
+    return stats
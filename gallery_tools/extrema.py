@@ -0,0 +1,305 @@
+"""
+High/low extrema finding and contour labeling shared by the examples that
+mark pressure centers with "H"/"L" labels (e.g. NCL_sat_1 and NCL_sat_2).
+
+Extrema always sit on grid points, so the label positions are taken from
+the projected coordinates of the whole grid. Those are computed with a
+single ``transform_points`` call and cached per (grid, projection) pair,
+which makes labeling further time steps of the same field free of any
+projection work.
+"""
+
+import hashlib
+import warnings
+
+import numpy as np
+from scipy.ndimage import maximum_filter, minimum_filter
+from sklearn.cluster import DBSCAN
+
+# Projected grid coordinates, keyed by (grid, source CRS, target CRS)
+_projected_grids = {}
+_MAX_PROJECTED_GRIDS = 8
+
+
+def findLocalExtrema(da, highVal=0, lowVal=1000, eType='Low', eps=10):
+    """
+    Utility function to find local low/high field variable coordinates on a contour map. To classify as a local high, the data
+    point must be greater than highVal, and to classify as a local low, the data point must be less than lowVal.
+
+    Args:
+        da: (:class:`xarray.DataArray`):
+            Xarray data array containing the lat, lon, and field variable (ex. pressure) data values.
+            If it has a leading dimension (ex. time) in front of lat and lon, the extrema of every
+            step along that dimension are found at once.
+        highVal (:class:`int`):
+            Data value that the local high must be greater than to qualify as a "local high" location.
+            Default highVal is 0.
+        lowVal (:class:`int`):
+            Data value that the local low must be less than to qualify as a "local low" location.
+            Default lowVal is 1000.
+        eType (:class:`str`):
+            'Low' or 'High'
+            Determines which extrema are being found- minimum or maximum, respectively.
+            Default eType is 'Low'.
+        eps (:class:`float`):
+            Distance in degrees within which neighboring extrema are considered part of the same
+            low/high, of which only the lowest/highest one is kept. Default eps is 10.
+    Returns:
+        clusterExtremas (:class:`list`):
+            List of coordinate tuples in GPS form (lon in degrees, lat in degrees)
+            that specify local low/high locations. For a data array with a leading
+            dimension, a list of such lists, one per step.
+    """
+
+    # Work on flat indices into the data array, so each candidate's value
+    # and coordinate can be looked up directly
+    values = np.asarray(da.transpose(..., 'lat', 'lon').data)
+    stacked = values.reshape((-1,) + values.shape[-2:])
+
+    # Find the points that are the lowest/highest of their 3x3 neighborhood
+    # (within their own step) and also qualify as low or high values
+    if eType == 'Low':
+        extrema = stacked == minimum_filter(
+            stacked, size=(1, 3, 3), mode='nearest')
+        extrema &= stacked < lowVal
+    if eType == 'High':
+        extrema = stacked == maximum_filter(
+            stacked, size=(1, 3, 3), mode='nearest')
+        extrema &= stacked > highVal
+    steps, latidx, lonidx = np.nonzero(extrema)
+
+    # Coordinates (lon, lat) and data values of the candidates
+    lons = np.asarray(da.lon)
+    lats = np.asarray(da.lat)
+    extremacoords = np.column_stack((lons[lonidx], lats[latidx]))
+    extremavals = stacked[steps, latidx, lonidx]
+
+    clusterExtremas = []
+    # np.nonzero returns the candidates ordered by step
+    bounds = np.searchsorted(steps, np.arange(stacked.shape[0] + 1))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        clusterExtremas.append(
+            _clusterExtrema(extremacoords[start:stop], extremavals[start:stop],
+                            eType, eps))
+
+    if values.ndim == 2:
+        return clusterExtremas[0]
+    return clusterExtremas
+
+
+def _clusterExtrema(extremacoords, extremavals, eType, eps):
+    """Keep the lowest/highest candidate of each DBSCAN cluster."""
+
+    if len(extremacoords) == 0:
+        if eType == 'Low':
+            warnings.warn(
+                'No local extrema with data value less than given lowVal')
+        if eType == 'High':
+            warnings.warn(
+                'No local extrema with data value greater than given highVal')
+        return []
+
+    # Use Density-based spatial clustering of applications with noise
+    # to cluster and label coordinates
+    labels = DBSCAN(eps=eps, min_samples=1).fit(extremacoords).labels_
+
+    # Sort the candidates by cluster label and then by data value, so the
+    # smallest/greatest field variable value of each cluster comes first
+    if eType == 'Low':
+        order = np.lexsort((extremavals, labels))
+    if eType == 'High':
+        order = np.lexsort((-extremavals, labels))
+    first = np.ones(order.size, dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+
+    return [(lon, lat) for lon, lat in extremacoords[order[first]]]
+
+
+def projectGrid(da, transform, proj):
+    """
+    Utility function to get the coordinates of every grid point of a data array in a map projection.
+    The whole grid is projected in one call and the result is cached, so later calls for the same grid
+    and projection (ex. other time steps of the same field) cost nothing.
+
+    Args:
+        da: (:class:`xarray.DataArray`):
+            Xarray data array with lat and lon coordinates.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of coordinates.
+            (ex. ccrs.Geodetic()).
+        proj (:class:`cartopy.crs`):
+            This is the instance of CRS that the coordinates will be transformed to.
+    Returns:
+        x, y (:class:`numpy.ndarray`):
+            Projected coordinates, with shape (lat, lon). Points that cannot be seen in the
+            projection are not finite.
+    """
+
+    lons = np.ascontiguousarray(da.lon, dtype='float64')
+    lats = np.ascontiguousarray(da.lat, dtype='float64')
+    key = (hashlib.sha1(lons.tobytes() + b'/' + lats.tobytes()).hexdigest(),
+           transform, proj)
+
+    if key not in _projected_grids:
+        if len(_projected_grids) >= _MAX_PROJECTED_GRIDS:
+            _projected_grids.pop(next(iter(_projected_grids)))
+        lon2d, lat2d = np.meshgrid(lons, lats)
+        points = proj.transform_points(transform, lon2d, lat2d)
+        _projected_grids[key] = (points[..., 0], points[..., 1])
+
+    return _projected_grids[key]
+
+
+def plotCLabels(ax,
+                contours,
+                transform,
+                proj,
+                clabel_locations=[],
+                fontsize=12,
+                whitebbox=False,
+                horizontal=False):
+    """
+    Utility function to plot contour labels by passing in a coordinate to the clabel function.
+    This allows the user to specify the exact locations of the labels, rather than having matplotlib
+    plot them automatically.
+
+    Args:
+        ax (:class:`matplotlib.pyplot.axis`):
+            Axis containing the contour set.
+        contours (:class:`cartopy.mpl.contour.GeoContourSet`):
+            Contour set that is being labeled.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of coordinates.
+            (ex. ccrs.Geodetic()).
+        proj (:class:`cartopy.crs`):
+            Projection 'ax' is defined by.
+            This is the instance of CRS that the coordinates will be transformed to.
+        clabel_locations (:class:`list`):
+            List of coordinate tuples in GPS form (lon in degrees, lat in degrees)
+            that specify where the contours with regular field variable values should be plotted.
+        fontsize (:class:`int`):
+            Font size of contour labels.
+        whitebbox (:class:`bool`):
+            Setting this to "True" will cause all labels to be plotted with white backgrounds
+        horizontal (:class:`bool`):
+            Setting this to "True" will cause the contour labels to be horizontal.
+    Returns:
+        cLabels (:class:`list`):
+            List of text instances of all contour labels
+    """
+
+    # Initialize empty array that will be filled with contour label text objects and returned
+    cLabels = []
+
+    # Plot any regular contour levels
+    if clabel_locations != []:
+        # Transform all label locations with one call
+        locations = np.asarray(clabel_locations, dtype='float64')
+        clevelpoints = proj.transform_points(transform, locations[:, 0],
+                                             locations[:, 1])
+        transformed_locations = [(x[0], x[1]) for x in clevelpoints]
+        ax.clabel(contours,
+                  manual=transformed_locations,
+                  inline=True,
+                  fontsize=fontsize,
+                  colors='black',
+                  fmt="%.0f")
+        [cLabels.append(txt) for txt in contours.labelTexts]
+
+        if horizontal is True:
+            [txt.set_rotation('horizontal') for txt in contours.labelTexts]
+
+    if whitebbox is True:
+        [
+            txt.set_bbox(dict(facecolor='white', edgecolor='none', pad=2))
+            for txt in cLabels
+        ]
+
+    return cLabels
+
+
+def plotELabels(ax,
+                da,
+                transform,
+                proj,
+                clabel_locations=[],
+                label='L',
+                fontsize=22,
+                whitebbox=False,
+                horizontal=True):
+    """
+    Utility function to plot contour labels. High/Low contour labels will be plotted using text boxes for more accurate label values
+    and placement.
+
+    Args:
+        ax (:class:`matplotlib.pyplot.axis`):
+            Axis the labels are drawn on.
+        da: (:class:`xarray.DataArray`):
+            Xarray data array containing the lat, lon, and field variable data values.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of coordinates.
+            (ex. ccrs.Geodetic()).
+        proj (:class:`cartopy.crs`):
+            Projection 'ax' is defined by.
+            This is the instance of CRS that the coordinates will be transformed to.
+        clabel_locations (:class:`list`):
+            List of coordinate tuples in GPS form (lon in degrees, lat in degrees)
+            that specify where the contour labels should be plotted, as returned by findLocalExtrema.
+            Locations that are not grid points of 'da' are skipped.
+        label (:class:`str`):
+            ex. 'L' or 'H'
+            The data value will be plotted as a subscript of this label.
+        fontsize (:class:`int`):
+            Font size of regular contour labels.
+        whitebbox (:class:`bool`):
+            Setting this to "True" will cause all labels to be plotted with white backgrounds
+        horizontal (:class:`bool`):
+            Setting this to "True" will cause the contour labels to be horizontal.
+    Returns:
+        extremaLabels (:class:`list`):
+            List of text instances of all contour labels
+    """
+
+    # Initialize empty array that will be filled with contour label text objects and returned
+    extremaLabels = []
+
+    if clabel_locations == []:
+        return extremaLabels
+
+    # Find the data array indices of all coordinates at once; coordinates
+    # that are not on the grid get an index of -1
+    lonidx = da.indexes['lon'].get_indexer([x[0] for x in clabel_locations])
+    latidx = da.indexes['lat'].get_indexer([x[1] for x in clabel_locations])
+    ongrid = (lonidx != -1) & (latidx != -1)
+    lonidx, latidx = lonidx[ongrid], latidx[ongrid]
+
+    # Look up the projected positions and the field variable data
+    x, y = projectGrid(da, transform, proj)
+    x, y = x[latidx, lonidx], y[latidx, lonidx]
+    values = np.asarray(da.transpose('lat', 'lon').data)[latidx, lonidx]
+
+    for xpos, ypos, value in zip(x, y, values):
+
+        # Skip points on the far side of the globe
+        if not (np.isfinite(xpos) and np.isfinite(ypos)):
+            continue
+
+        lab = ax.text(xpos,
+                      ypos,
+                      label + "$_{" + str(int(round(value))) + "}$",
+                      fontsize=fontsize,
+                      horizontalalignment='center',
+                      verticalalignment='center')
+
+        if horizontal is True:
+            lab.set_rotation('horizontal')
+
+        extremaLabels.append(lab)
+
+    if whitebbox is True:
+        [
+            txt.set_bbox(dict(facecolor='white', edgecolor='none', pad=2))
+            for txt in extremaLabels
+        ]
+
+    return extremaLabels
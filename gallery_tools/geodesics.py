@@ -0,0 +1,73 @@
+"""
+Batched geodesic (great circle) paths, as drawn by NCL_polyg_14.
+
+Computing the points of a path with ``geographiclib`` means one
+``InverseLine`` and one ``Position`` call per point, all in Python. Here
+the same GeographicLib algorithms are run through ``pyproj.Geod`` (PROJ's C
+implementation, installed with cartopy) on whole arrays: one inverse
+problem for all routes, then one direct problem for all points of all
+routes, so maps with thousands of routes are computed in a few array
+operations.
+"""
+
+import numpy as np
+from pyproj import Geod
+
+
+def geodesic_paths(start_lon,
+                   start_lat,
+                   end_lon,
+                   end_lat,
+                   npoints,
+                   ellps='WGS84'):
+    """
+    Utility function to compute points equally spaced along the geodesics between many pairs of points.
+
+    Args:
+        start_lon, start_lat (:class:`float` or :class:`numpy.ndarray`):
+            Longitude and latitude of the start of every route, in degrees.
+        end_lon, end_lat (:class:`float` or :class:`numpy.ndarray`):
+            Longitude and latitude of the end of every route, in degrees. All four arguments are
+            broadcast against each other.
+        npoints (:class:`int`):
+            Number of points on every route, including both ends.
+        ellps (:class:`str`):
+            Ellipsoid, as named by PROJ. Default ellps is 'WGS84'.
+    Returns:
+        lons, lats (:class:`numpy.ndarray`):
+            Points of the routes, with shape (route, npoints), or (npoints,) for scalar arguments.
+            The points are equally spaced by true distance. Longitudes are unrolled, so they change
+            continuously along a route that crosses the antimeridian (ex. from 170 to 190 rather than
+            to -170) and the first one is start_lon.
+    """
+
+    start_lon, start_lat, end_lon, end_lat = np.broadcast_arrays(
+        *(np.asarray(a, dtype='float64')
+          for a in (start_lon, start_lat, end_lon, end_lat)))
+    shape = start_lon.shape + (npoints,)
+
+    geod = Geod(ellps=ellps)
+    azimuth, _, distance = geod.inv(start_lon.ravel(), start_lat.ravel(),
+                                    end_lon.ravel(), end_lat.ravel())
+
+    # Distance of every point from the start of its route
+    fraction = np.linspace(0, 1, npoints)
+    distances = np.asarray(distance)[:, np.newaxis] * fraction
+
+    repeat = (np.repeat(a, npoints)
+              for a in (start_lon.ravel(), start_lat.ravel(), azimuth))
+    lons, lats, _ = geod.fwd(*repeat, distances.ravel())
+    lons = np.asarray(lons).reshape(-1, npoints)
+    lats = np.asarray(lats).reshape(-1, npoints)
+
+    # pyproj wraps longitudes into [-180, 180]. Along a geodesic the
+    # longitude only ever grows (heading east) or shrinks (heading west), so
+    # every step between two points is unrolled in the direction of the
+    # initial azimuth, even for steps of 180 degrees or more near a pole
+    east = np.sin(np.radians(np.asarray(azimuth)))[:, np.newaxis] >= 0
+    step = np.diff(lons, axis=1)
+    step = np.where(east, step % 360, -(-step % 360))
+    lons = start_lon.reshape(-1, 1) + np.concatenate(
+        (np.zeros((len(lons), 1)), np.cumsum(step, axis=1)), axis=1)
+
+    return lons.reshape(shape), lats.reshape(shape)
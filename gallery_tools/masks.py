@@ -0,0 +1,83 @@
+"""
+Rasterized masks of geographical regions on data grids.
+
+Clipping contours to a boundary (as in NCL_overlay_11b) keeps them sharp
+up to the boundary but makes matplotlib clip every contour path against
+every boundary path. Masking the field on its grid instead, i.e. setting the
+points outside of the region to NaN before contouring, costs no more than
+an unmasked plot; the price is that the contours end on grid cells rather
+than exactly on the boundary.
+
+The masks are computed with one vectorized point-in-polygon test over all
+grid points and kept both in memory and on disk, in ``<cartopy
+data_dir>/masks`` or the directory named by ``GALLERY_MASK_CACHE``, keyed
+by the geometries and the grid.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import cartopy
+import numpy as np
+import shapely
+
+# Masks computed in this process, keyed like the files on disk
+_masks = {}
+
+
+def cache_dir():
+    """Directory the masks are stored in."""
+
+    return os.environ.get('GALLERY_MASK_CACHE',
+                          os.path.join(cartopy.config['data_dir'], 'masks'))
+
+
+def grid_mask(geometries, lon, lat):
+    """
+    Utility function to find the points of a rectilinear grid that are inside of a region.
+
+    Args:
+        geometries (:class:`list`):
+            Shapely geometries of the region, in the coordinates of the grid (ex. longitude and latitude).
+        lon (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            1D longitudes of the grid.
+        lat (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            1D latitudes of the grid.
+    Returns:
+        mask (:class:`numpy.ndarray`):
+            Boolean array with shape (lat, lon), True inside of the region. Pass it to the 'where'
+            method of the data array to set the other points to NaN.
+    """
+
+    lon = np.ascontiguousarray(lon, dtype='float64')
+    lat = np.ascontiguousarray(lat, dtype='float64')
+    sha = hashlib.sha256()
+    for geometry in geometries:
+        sha.update(shapely.to_wkb(geometry))
+    sha.update(lon.tobytes() + b'/' + lat.tobytes())
+    key = sha.hexdigest()
+
+    if key in _masks:
+        return _masks[key]
+
+    path = os.path.join(cache_dir(), key + '.npy')
+    try:
+        mask = np.load(path)
+    except (OSError, ValueError):
+        region = shapely.union_all(list(geometries))
+        shapely.prepare(region)
+        lon2d, lat2d = np.meshgrid(lon, lat)
+        mask = shapely.intersects_xy(region, lon2d, lat2d)
+        _save(path, mask)
+
+    _masks[key] = mask
+    return mask
+
+
+def _save(path, mask):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, mask)
+    os.replace(tmp, path)
@@ -0,0 +1,288 @@
+"""
+On-disk cache of Natural Earth geometries that are already clipped,
+projected and simplified for a particular map.
+
+Map examples read Natural Earth shapefiles through
+``cartopy.io.shapereader`` on every run and cartopy reprojects every
+geometry into the map projection while drawing. Here that work is done once
+per (dataset, scale, projection, extent, tolerance): the resulting
+geometries are stored as the flat coordinate and offset arrays of
+``shapely.to_ragged_array`` in ``.npy`` files, which are memory-mapped when
+read back. Later renders of the same map rebuild the geometries from those
+arrays without parsing or projecting anything.
+
+The geometries are returned in map coordinates, so they are drawn with the
+map projection itself as their CRS (e.g. ``ShapelyFeature(geoms,
+crs=ax.projection)``), for which cartopy does not project them again.
+
+Cache entries live in ``<cartopy data_dir>/projected`` by default, or in
+the directory named by the ``GALLERY_GEOMETRY_CACHE`` environment variable.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import cartopy
+import cartopy.crs as ccrs
+import numpy as np
+import shapely
+from cartopy.feature import ShapelyFeature
+from cartopy.io import shapereader
+
+# Bump when the layout of the cache entries changes
+FORMAT_VERSION = 1
+
+# Fraction of the map size added on every side before clipping, so clipped
+# edges stay outside of a map drawn with the same extent
+MARGIN = 0.05
+
+# Empty geometry of every dimension
+_EMPTY = {
+    0: 'MULTIPOINT EMPTY',
+    1: 'MULTILINESTRING EMPTY',
+    2: 'MULTIPOLYGON EMPTY'
+}
+
+
+def cache_dir():
+    """Directory the cache entries live in."""
+
+    return os.environ.get(
+        'GALLERY_GEOMETRY_CACHE',
+        os.path.join(cartopy.config['data_dir'], 'projected'))
+
+
+def projected_geometries(category,
+                         name,
+                         resolution,
+                         proj,
+                         extent=None,
+                         tolerance=0,
+                         fields=()):
+    """
+    Utility function to get the geometries of a Natural Earth dataset clipped to an extent, projected
+    and simplified, from the cache when they were computed before.
+
+    Args:
+        category (:class:`str`):
+            Natural Earth category, ex. 'cultural' or 'physical'.
+        name (:class:`str`):
+            Natural Earth dataset, ex. 'admin_0_countries'.
+        resolution (:class:`str`):
+            Natural Earth scale: '10m', '50m' or '110m'.
+        proj (:class:`cartopy.crs`):
+            This is the instance of CRS that the geometries will be transformed to.
+        extent (:class:`list`):
+            Optional [lon_min, lon_max, lat_min, lat_max] of the map, as passed to ax.set_extent.
+            Geometries outside of the area the map shows are dropped and the others are clipped to it,
+            with a margin of MARGIN on every side.
+        tolerance (:class:`float`):
+            Tolerance of the simplification, in projected units. Default tolerance is 0 (no simplification).
+        fields (:class:`list`):
+            Record attributes to keep with every geometry, ex. ['ADMIN'].
+    Returns:
+        geometries (:class:`numpy.ndarray`):
+            Array of shapely geometries in projected coordinates.
+        records (:class:`list`):
+            One dictionary per geometry, holding the requested fields.
+    """
+
+    shapefile = shapereader.natural_earth(resolution=resolution,
+                                          category=category,
+                                          name=name)
+    stat = os.stat(shapefile)
+    description = {
+        'version': FORMAT_VERSION,
+        'dataset': [category, name, resolution, stat.st_size, stat.st_mtime],
+        'projection': proj.proj4_init,
+        'extent': None if extent is None else [float(x) for x in extent],
+        'tolerance': float(tolerance),
+        'fields': list(fields),
+    }
+    key = hashlib.sha256(
+        json.dumps(description, sort_keys=True).encode()).hexdigest()
+    entry = os.path.join(cache_dir(), key)
+
+    if not os.path.isdir(entry):
+        geometries, records = project_shapefile(shapefile, proj, extent,
+                                                tolerance, fields)
+        _write_entry(entry, geometries, records, description)
+
+    return _read_entry(entry)
+
+
+def projected_feature(category,
+                      name,
+                      resolution,
+                      proj,
+                      extent=None,
+                      tolerance=0,
+                      **kwargs):
+    """
+    Utility function to get a Natural Earth dataset as a feature drawn from the cache.
+
+    Args:
+        category, name, resolution, proj, extent, tolerance:
+            See projected_geometries.
+        kwargs:
+            Passed on to :class:`cartopy.feature.ShapelyFeature` (ex. facecolor, edgecolor).
+    Returns:
+        feature (:class:`cartopy.feature.ShapelyFeature`):
+            Feature with the geometries in the coordinates of 'proj', to be added with ax.add_feature.
+    """
+
+    geometries, _ = projected_geometries(category, name, resolution, proj,
+                                         extent, tolerance)
+    return ShapelyFeature(geometries, crs=proj, **kwargs)
+
+
+def project_shapefile(shapefile, proj, extent=None, tolerance=0, fields=()):
+    """
+    Utility function to clip, project and simplify the geometries of a shapefile in longitude and latitude.
+
+    Args:
+        shapefile (:class:`str`):
+            Path to the shapefile.
+        proj, extent, tolerance, fields:
+            See projected_geometries.
+    Returns:
+        geometries (:class:`list`):
+            Non-empty shapely geometries in projected coordinates.
+        records (:class:`list`):
+            One dictionary per geometry, holding the requested fields.
+    """
+
+    source = ccrs.PlateCarree()
+    clip = select = None
+    if extent is not None:
+        clip, select = _clip_boxes(proj, extent)
+
+    geometries = []
+    records = []
+    for record in shapereader.Reader(shapefile).records():
+        geom = record.geometry
+        if geom is None or (select is not None and
+                            not geom.intersects(select)):
+            continue
+        projected = proj.project_geometry(geom, source)
+        if clip is not None:
+            projected = projected.intersection(clip)
+        if tolerance:
+            projected = projected.simplify(tolerance)
+        # Clipping and projecting can leave lines or points of an area (and
+        # so on), which shapely.to_ragged_array cannot store with the others
+        projected = _same_dimension(projected, geom)
+        if projected.is_empty:
+            continue
+        geometries.append(projected)
+        records.append({field: record.attributes[field] for field in fields})
+
+    return geometries, records
+
+
+def _clip_boxes(proj, extent):
+    """
+    Rectangle in projected coordinates that a map with the given extent
+    shows (as computed by GeoAxes.set_extent) with a margin of MARGIN, and
+    a longitude/latitude box around it to skip far away geometries early.
+    """
+
+    source = ccrs.PlateCarree()
+    x0, x1, y0, y1 = extent
+    xmin, ymin, xmax, ymax = proj.project_geometry(shapely.box(x0, y0, x1, y1),
+                                                   source).bounds
+    dx, dy = (xmax - xmin) * MARGIN, (ymax - ymin) * MARGIN
+    clip = shapely.box(xmin - dx, ymin - dy, xmax + dx, ymax + dy)
+
+    # The edges of the rectangle in longitude and latitude, to bound them
+    edge = np.linspace(0, 1, 100)
+    xs = np.concatenate((xmin - dx + edge * (xmax - xmin + 2 * dx),
+                         np.full(100, xmax + dx),
+                         xmin - dx + edge * (xmax - xmin + 2 * dx),
+                         np.full(100, xmin - dx)))
+    ys = np.concatenate((np.full(100, ymin - dy),
+                         ymin - dy + edge * (ymax - ymin + 2 * dy),
+                         np.full(100, ymax + dy),
+                         ymin - dy + edge * (ymax - ymin + 2 * dy)))
+    lonlat = source.transform_points(proj, xs, ys)
+    lons, lats = lonlat[:, 0], lonlat[:, 1]
+    finite = np.isfinite(lons) & np.isfinite(lats)
+    if not finite.all():
+        # Parts of the rectangle are off the globe, don't guess
+        return clip, None
+    pad = 1
+    select = shapely.box(lons.min() - pad, lats.min() - pad,
+                         lons.max() + pad, lats.max() + pad)
+    return clip, select
+
+
+def _same_dimension(geom, like):
+    """Non-empty parts of a geometry with the dimension of another one (ex.
+    the polygons of a clipped area, without the lines and points left where
+    it touched the clipping box), as one geometry."""
+
+    dimension = shapely.get_dimensions(like)
+    # Split multi-part geometries and collections down to single parts
+    parts = np.array([geom], dtype=object)
+    multi = shapely.get_type_id(parts) >= shapely.GeometryType.MULTIPOINT
+    while multi.any():
+        parts = np.concatenate(
+            (parts[~multi], shapely.get_parts(parts[multi])))
+        multi = shapely.get_type_id(parts) >= shapely.GeometryType.MULTIPOINT
+    parts = parts[(shapely.get_dimensions(parts) == dimension) &
+                  ~shapely.is_empty(parts)]
+
+    if len(parts) == 1:
+        return parts[0]
+    if not len(parts):
+        return shapely.from_wkt(_EMPTY[dimension])
+    if dimension == 2:
+        return shapely.multipolygons(parts)
+    if dimension == 1:
+        return shapely.multilinestrings(parts)
+    return shapely.multipoints(parts)
+
+
+def _write_entry(entry, geometries, records, description):
+    root = os.path.dirname(entry)
+    os.makedirs(root, exist_ok=True)
+    # Populate a temporary directory and rename it, so readers never see a
+    # partial entry
+    tmp = tempfile.mkdtemp(dir=root)
+    try:
+        meta = dict(description, records=records, geometry_type=None)
+        if geometries:
+            geometry_type, coords, offsets = shapely.to_ragged_array(
+                geometries)
+            meta.update(geometry_type=int(geometry_type),
+                        offsets=len(offsets))
+            np.save(os.path.join(tmp, 'coords.npy'), coords)
+            for i, offset in enumerate(offsets):
+                np.save(os.path.join(tmp, f'offsets{i}.npy'), offset)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, entry)
+    except OSError:
+        # Another process stored the same entry first
+        if not os.path.isdir(entry):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read_entry(entry):
+    with open(os.path.join(entry, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta['geometry_type'] is None:
+        return np.empty(0, dtype=object), meta['records']
+
+    coords = np.load(os.path.join(entry, 'coords.npy'), mmap_mode='r')
+    offsets = tuple(
+        np.load(os.path.join(entry, f'offsets{i}.npy'), mmap_mode='r')
+        for i in range(meta['offsets']))
+    geometries = shapely.from_ragged_array(
+        shapely.GeometryType(meta['geometry_type']), coords, offsets)
+    return geometries, meta['records']
@@ -0,0 +1,111 @@
+"""
+Memory-mapped reads of classic netCDF (netCDF3) files.
+
+Many inputs of the gallery (``uv300.nc``, ``atmos.nc``, ``sst8292.nc``,
+``uvt.nc``, ...) are classic netCDF files: fixed size, uncompressed,
+big-endian variables at known offsets. Such files can be mapped into memory
+and sliced in place. Read through xarray's scipy backend with ``mmap=True``,
+a hyperslab like ``uv.U.sel(date=198801, lev=1000)`` stays a view of the
+mapped file until its values are used; only then are the bytes of that slab
+read (through the page cache, without a read buffer) and converted from
+big-endian into a native array. The rest of the file is never read or
+copied, which cuts both the I/O and the peak memory of examples that use a
+few fields of a large file.
+
+The mode is opt-in: open a file with open_mapped, or build the gallery with
+``GALLERY_NETCDF3_MMAP=1`` to have the ``use_mmap`` hook in ``conf.py`` send
+every classic file opened with ``xarray.open_dataset`` (and no explicit
+engine) through it. netCDF-4 and CDF5 files are opened as before.
+"""
+
+import os
+
+# xarray.open_dataset as it was before use_mmap replaced it
+_open_dataset = None
+
+
+def is_classic(path):
+    """
+    Utility function to tell whether a file is classic netCDF that can be
+    memory-mapped.
+
+    Args:
+        path (:class:`str`):
+            Path of the file.
+    Returns:
+        classic (:class:`bool`):
+            True for the CDF-1 (classic) and CDF-2 (64-bit offset) formats.
+    """
+
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+    except OSError:
+        return False
+    return magic in (b'CDF\x01', b'CDF\x02')
+
+
+def open_mapped(path, **kwargs):
+    """
+    Utility function to open a classic netCDF file memory-mapped.
+
+    Args:
+        path (:class:`str`):
+            Path of the file, see is_classic.
+        kwargs:
+            Passed on to xarray.open_dataset (ex. decode_times=False).
+    Returns:
+        ds (:class:`xarray.Dataset`):
+            Dataset whose variables are lazy views of the mapped file.
+            Selecting from them reads nothing; values are read and converted to
+            native byte order when they are used.
+    """
+
+    import xarray as xr
+
+    xr_open_dataset = _open_dataset or xr.open_dataset
+    return xr_open_dataset(path, engine='scipy', mmap=True, **kwargs)
+
+
+def open_dataset(filename_or_obj, *args, **kwargs):
+    """
+    Utility function to open a dataset memory-mapped when it is a classic
+    netCDF file.
+
+    Args:
+        filename_or_obj (:class:`str`):
+            Path of the file, as passed to xarray.open_dataset.
+        args, kwargs:
+            Passed on to xarray.open_dataset (ex. decode_times=False).
+    Returns:
+        ds (:class:`xarray.Dataset`):
+            Dataset read with open_mapped for classic files opened without an
+            explicit engine, otherwise as xarray.open_dataset reads it.
+    """
+
+    import xarray as xr
+
+    if (not args and kwargs.get('engine') is None and
+            isinstance(filename_or_obj, (str, os.PathLike)) and
+            is_classic(filename_or_obj)):
+        kwargs.pop('engine', None)
+        return open_mapped(filename_or_obj, **kwargs)
+    return (_open_dataset or xr.open_dataset)(filename_or_obj, *args,
+                                              **kwargs)
+
+
+def use_mmap(gallery_conf, fname):
+    """
+    sphinx-gallery ``reset_modules`` hook making ``xarray.open_dataset``
+    memory-map classic netCDF files when ``GALLERY_NETCDF3_MMAP`` is set. It
+    is installed once per process.
+    """
+
+    global _open_dataset
+    if _open_dataset is not None or not os.environ.get('GALLERY_NETCDF3_MMAP'):
+        return
+
+    import xarray as xr
+
+    _open_dataset = xr.open_dataset
+    xr.open_dataset = open_dataset
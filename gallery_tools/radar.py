@@ -0,0 +1,142 @@
+"""
+Cartesian meshes for radar sweeps, as drawn by NCL_radar_1.
+
+A sweep is a (azimuth, gate) array of values. Drawing it needs the x and y
+of every cell, i.e. the cos and sin of every azimuth times the range of
+every gate, which only depend on the azimuths and the gate geometry and not
+on the values. The meshes are therefore computed once per (azimuths, gate
+spacing, gate count) and shared by every sweep with the same geometry; they
+are returned read-only, since the same arrays are handed to every caller.
+
+The azimuths of the data are never modified: a sweep that wraps around
+north (ex. 300, ..., 359, 0, ..., 299) is unrolled on a copy.
+
+For a real-time display or the sweeps of a volume scan, draw the first
+sweep with plot_sweep and show the next ones with ``set_sweep(mesh,
+values)``, which swaps the values of the returned mesh; nothing else is
+redrawn or recomputed.
+"""
+
+import functools
+
+import numpy as np
+
+
+def unroll_azimuths(azimuth):
+    """
+    Utility function to make the azimuths of a sweep monotonic across north.
+
+    Args:
+        azimuth (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Azimuths of the rays of a sweep, in degrees.
+    Returns:
+        azimuth (:class:`numpy.ndarray`):
+            New array with the same angles, with multiples of 360 added where the sweep passes north
+            so they change continuously.
+    """
+
+    return np.unwrap(np.asarray(azimuth, dtype='float64'), period=360)
+
+
+def polar_mesh(azimuth, gate_spacing, ngates):
+    """
+    Utility function to get the Cartesian coordinates of the centers of the cells of a sweep.
+
+    Args:
+        azimuth (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Azimuths of the rays, in degrees counterclockwise from the x axis.
+        gate_spacing (:class:`float`):
+            Distance between gates, ex. in km.
+        ngates (:class:`int`):
+            Number of gates along every ray. The first gate is at the radar.
+    Returns:
+        X, Y (:class:`numpy.ndarray`):
+            Read-only coordinates with shape (azimuth, gate), in the units of gate_spacing.
+    """
+
+    azimuth = unroll_azimuths(azimuth)
+    return _polar_mesh(azimuth.tobytes(), float(gate_spacing), int(ngates))
+
+
+def polar_edges(azimuth, gate_spacing, ngates):
+    """
+    Utility function to get the Cartesian coordinates of the corners of the cells of a sweep.
+
+    Args:
+        azimuth, gate_spacing, ngates:
+            See polar_mesh.
+    Returns:
+        X, Y (:class:`numpy.ndarray`):
+            Read-only coordinates with shape (azimuth + 1, gate + 1), to be passed to pcolormesh.
+            Cells span halfway to the neighbouring rays and gates.
+    """
+
+    azimuth = unroll_azimuths(azimuth)
+    return _polar_edges(azimuth.tobytes(), float(gate_spacing), int(ngates))
+
+
+def plot_sweep(ax, azimuth, gate_spacing, values, **kwargs):
+    """
+    Utility function to draw a sweep as a mesh whose values can be swapped for the next sweep.
+
+    Args:
+        ax (:class:`matplotlib.axes._subplots.AxesSubplot`):
+            Current axes to the current figure.
+        azimuth (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Azimuths of the rays, in degrees counterclockwise from the x axis.
+        gate_spacing (:class:`float`):
+            Distance between gates, ex. in km.
+        values (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Data of the sweep, with shape (azimuth, gate).
+        kwargs:
+            Passed on to ax.pcolormesh (ex. cmap, norm).
+    Returns:
+        mesh (:class:`matplotlib.collections.QuadMesh`):
+            Mesh of the sweep. Pass it to set_sweep with the values of a sweep with the same
+            azimuths and gates to show it instead.
+    """
+
+    values = np.asanyarray(values)
+    X, Y = polar_edges(azimuth, gate_spacing, values.shape[1])
+    return ax.pcolormesh(X, Y, values, **kwargs)
+
+
+def set_sweep(mesh, values):
+    """
+    Utility function to show another sweep in a mesh drawn by plot_sweep.
+
+    Args:
+        mesh (:class:`matplotlib.collections.QuadMesh`):
+            Mesh returned by plot_sweep.
+        values (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Data of the sweep, with the shape (azimuth, gate) of the drawn one.
+    """
+
+    # QuadMesh takes its values flattened (a 2D array is only accepted by
+    # recent matplotlib versions); masked values stay masked
+    mesh.set_array(np.asanyarray(values).ravel())
+
+
+@functools.lru_cache(maxsize=16)
+def _polar_mesh(azimuth, gate_spacing, ngates):
+    theta = np.deg2rad(np.frombuffer(azimuth, dtype='float64'))
+    r = np.arange(ngates) * gate_spacing
+    return _read_only(np.outer(np.cos(theta), r), np.outer(np.sin(theta), r))
+
+
+@functools.lru_cache(maxsize=16)
+def _polar_edges(azimuth, gate_spacing, ngates):
+    theta = np.frombuffer(azimuth, dtype='float64')
+    # Halfway between the rays, and as far beyond the first and last ones
+    middle = (theta[1:] + theta[:-1]) / 2
+    edges = np.concatenate(([2 * theta[0] - middle[0]], middle,
+                            [2 * theta[-1] - middle[-1]]))
+    theta = np.deg2rad(edges)
+    r = np.clip((np.arange(ngates + 1) - 0.5) * gate_spacing, 0, None)
+    return _read_only(np.outer(np.cos(theta), r), np.outer(np.sin(theta), r))
+
+
+def _read_only(*arrays):
+    for a in arrays:
+        a.flags.writeable = False
+    return arrays
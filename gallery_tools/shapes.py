@@ -0,0 +1,171 @@
+"""
+Bulk rendering of shapefile polygons for the examples that fill regions
+read with pyshp (e.g. NCL_shapefiles_1).
+
+Drawing one ``matplotlib.patches.Polygon`` per part, each with its own
+``transform=ccrs.PlateCarree()``, makes cartopy project every patch
+separately. Here all shapes are read once, their vertices are stacked into
+a single array with the parts marked by offsets, projected with one
+``transform_points`` call and drawn as a single ``PathCollection``.
+Clipping and selecting shapes are done with boolean masks over the stacked
+vertices (see ``filter_polygons``).
+"""
+
+import cartopy.crs as ccrs
+import numpy as np
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
+
+
+def read_polygons(reader):
+    """
+    Utility function to read the vertices of every shape of a shapefile at once.
+
+    Args:
+        reader (:class:`shapefile.Reader`):
+            Open pyshp reader of a polygon shapefile.
+    Returns:
+        vertices (:class:`numpy.ndarray`):
+            (lon, lat) of all shapes, stacked in one array of shape (npoints, 2).
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every part.
+        owner (:class:`numpy.ndarray`):
+            Index of the shape (and record) every part belongs to.
+    """
+
+    shapes = reader.shapes()
+    points = [
+        np.asarray(shape.points, dtype='float64').reshape(-1, 2)
+        for shape in shapes
+    ]
+    counts = np.array([len(p) for p in points], dtype='int64')
+    nparts = np.array([len(shape.parts) for shape in shapes], dtype='int64')
+
+    # Part offsets in pyshp are relative to their shape, so shift them by
+    # where each shape starts in the stacked array
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    parts = np.concatenate([np.asarray(shape.parts, dtype='int64')
+                            for shape in shapes] + [np.empty(0, 'int64')])
+    parts += np.repeat(starts, nparts)
+    owner = np.repeat(np.arange(len(shapes)), nparts)
+
+    return np.concatenate(points + [np.empty((0, 2))]), parts, owner
+
+
+def project_polygons(vertices, parts, proj, transform=None):
+    """
+    Utility function to project stacked polygon vertices with a single call and split them into paths.
+
+    Args:
+        vertices (:class:`numpy.ndarray`):
+            Stacked vertices, as returned by read_polygons.
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every part.
+        proj (:class:`cartopy.crs`):
+            This is the instance of CRS that the vertices will be transformed to.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of the vertices.
+            Default is ccrs.PlateCarree().
+    Returns:
+        paths (:class:`list`):
+            One :class:`matplotlib.path.Path` per part, in projected coordinates.
+    """
+
+    if transform is None:
+        transform = ccrs.PlateCarree()
+    xy = proj.transform_points(transform, vertices[:, 0], vertices[:, 1])
+    return polygon_paths(xy[:, :2], parts)
+
+
+def polygon_paths(vertices, parts):
+    """
+    Utility function to split stacked polygon vertices into one path per part.
+
+    Args:
+        vertices (:class:`numpy.ndarray`):
+            Stacked vertices, as returned by read_polygons.
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every part.
+    Returns:
+        paths (:class:`list`):
+            One :class:`matplotlib.path.Path` per part.
+    """
+
+    if len(parts) == 0:
+        return []
+    return [Path(part) for part in np.split(vertices, parts[1:])]
+
+
+def part_index(vertices, parts):
+    """
+    Utility function to get the part every vertex belongs to.
+
+    Args:
+        vertices (:class:`numpy.ndarray`):
+            Stacked vertices, as returned by read_polygons.
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every part.
+    Returns:
+        index (:class:`numpy.ndarray`):
+            Index into 'parts' for every vertex. Index 'owner' with it to get the shape of every vertex.
+    """
+
+    lengths = np.diff(np.append(parts, len(vertices)))
+    return np.repeat(np.arange(len(parts)), lengths)
+
+
+def filter_polygons(vertices, parts, owner, keep):
+    """
+    Utility function to keep only some vertices of stacked polygons (ex. to clip them or to select
+    some of the shapes with a mask), dropping the parts that are left without vertices.
+
+    Args:
+        vertices (:class:`numpy.ndarray`):
+            Stacked vertices, as returned by read_polygons.
+        parts (:class:`numpy.ndarray`):
+            Index in 'vertices' of the first point of every part.
+        owner (:class:`numpy.ndarray`):
+            Index of the shape every part belongs to.
+        keep (:class:`numpy.ndarray`):
+            Boolean mask over 'vertices'.
+    Returns:
+        vertices, parts, owner (:class:`numpy.ndarray`):
+            The kept vertices, with the offsets and owners of their parts.
+    """
+
+    counts = np.bincount(part_index(vertices, parts)[keep],
+                         minlength=len(parts))
+    nonempty = counts > 0
+    offsets = np.concatenate(([0], np.cumsum(counts[nonempty])[:-1]))
+    return vertices[keep], offsets.astype('int64'), owner[nonempty]
+
+
+def shapefile_collection(reader, proj, values=None, transform=None, **kwargs):
+    """
+    Utility function to turn all polygons of a shapefile into one collection.
+
+    Args:
+        reader (:class:`shapefile.Reader`):
+            Open pyshp reader of a polygon shapefile.
+        proj (:class:`cartopy.crs`):
+            Projection of the axes the collection will be added to.
+        values (:class:`numpy.ndarray`):
+            Optional value per record. Every part of a shape is colored by the value of its
+            record through the 'cmap' and 'norm' keyword arguments.
+        transform (:class:`cartopy._crs`):
+            Instance of CRS that represents the source coordinate system of the shapefile.
+            Default is ccrs.PlateCarree().
+        kwargs:
+            Passed on to :class:`matplotlib.collections.PathCollection` (ex. edgecolor, linewidth, zorder).
+    Returns:
+        collection (:class:`matplotlib.collections.PathCollection`):
+            Collection with one path per part, to be added with ax.add_collection.
+    """
+
+    vertices, parts, owner = read_polygons(reader)
+    collection = PathCollection(project_polygons(vertices, parts, proj,
+                                                 transform),
+                                **kwargs)
+    if values is not None:
+        collection.set_array(np.asarray(values)[owner])
+    return collection
@@ -0,0 +1,59 @@
+"""
+Loader for the January 1996 snow storm case used by NCL_overlay_6.
+
+The case is split over six netCDF files, one per variable. They are opened
+here concurrently and combined into one lazily loaded dataset, so selecting
+a timestep only reads that slab of each variable and a loop over all
+timesteps never reopens a file.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import xarray as xr
+
+# Files of the storm case, found by the datafile prefetch and build cache
+DATAFILES = (
+    'netcdf_files/Ustorm.cdf',
+    'netcdf_files/Vstorm.cdf',
+    'netcdf_files/Pstorm.cdf',
+    'netcdf_files/Tstorm.cdf',
+    'netcdf_files/U500storm.cdf',
+    'netcdf_files/V500storm.cdf',
+)
+
+# Name of each variable in the combined dataset and in its file, in the
+# order of DATAFILES
+VARIABLES = (('u', 'u'), ('v', 'v'), ('p', 'p'), ('t', 't'), ('u500', 'u'),
+             ('v500', 'v'))
+
+# Dataset opened in this process
+_storm = None
+
+
+def open_storm():
+    """
+    Utility function to open all storm variables as one dataset.
+
+    Returns:
+        storm (:class:`xarray.Dataset`):
+            Dataset with the variables u, v, p, t, u500 and v500, aligned on the coordinates they
+            share (ex. lat, lon and timestep). Nothing is read until values are used, so
+            storm.isel(timestep=n) only reads step n. The dataset is opened once per process.
+    """
+
+    global _storm
+    if _storm is not None:
+        return _storm
+
+    import geocat.datafiles as gdf
+
+    def open_variable(path, names):
+        name, variable = names
+        ds = xr.open_dataset(gdf.get(path))
+        return ds[variable].rename(name)
+
+    with ThreadPoolExecutor(max_workers=len(DATAFILES)) as executor:
+        variables = list(executor.map(open_variable, DATAFILES, VARIABLES))
+
+    _storm = xr.merge(variables, join='inner', combine_attrs='drop')
+    return _storm
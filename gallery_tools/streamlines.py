@@ -0,0 +1,83 @@
+"""
+Arrows along the streamlines of a ``streamplot``.
+
+Streamplots drawn with ``arrowstyle='-'`` have no arrow heads; examples
+like NCL_overlay_6 add them with a ``quiver`` at regular intervals along the
+lines. The positions and directions are taken here from the packed vertices
+of the streamlines' ``LineCollection`` with array indexing only, so the cost
+does not depend on how many segments a dense streamplot produces.
+
+Depending on the matplotlib version, the ``LineCollection`` holds one line
+per streamline or one two-point line per step of a streamline; both are
+handled the same way.
+"""
+
+import numpy as np
+
+
+def streamline_arrows(lines, period=7, spacing=None, offset=0.5):
+    """
+    Utility function to find where to draw arrows on streamlines and which way they point.
+
+    Args:
+        lines (:class:`matplotlib.collections.LineCollection`):
+            Streamlines, ex. the 'lines' attribute of the object returned by ax.streamplot.
+        period (:class:`int`):
+            Put an arrow on every period-th segment, counting along all streamlines. Default period is 7.
+            Ignored when spacing is given.
+        spacing (:class:`float`):
+            Optional distance along each streamline between arrows, in the coordinates of the lines.
+        offset (:class:`float`):
+            Distance from the start of each streamline to its first arrow, as a fraction of spacing.
+            Default offset is 0.5.
+    Returns:
+        x, y, dx, dy (:class:`numpy.ndarray`):
+            Start of the segments the arrows are on and their direction, to be passed to ax.quiver.
+    """
+
+    segments = lines.get_segments()
+    if len(segments) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+
+    # All vertices in one array, with the index of the end of every line
+    vertices = np.concatenate(segments)
+    ends = np.cumsum(np.fromiter(map(len, segments), dtype='int64',
+                                 count=len(segments)))
+
+    # A segment starts at every vertex but the last one of each line
+    first = np.ones(len(vertices), dtype=bool)
+    first[ends - 1] = False
+    starts = np.flatnonzero(first)
+    step = vertices[starts + 1] - vertices[starts]
+
+    if spacing is None:
+        chosen = np.arange(0, len(starts), period)
+    else:
+        # Distance along its streamline at the start and the end of every
+        # segment; an arrow goes on each segment that crosses a point
+        # offset * spacing + n * spacing along its line
+        length = np.hypot(step[:, 0], step[:, 1])
+        travelled = np.cumsum(length)
+        before = np.concatenate(([0.], travelled[:-1]))
+
+        # Lines that start where the previous one ended are pieces of the
+        # same streamline
+        line = np.searchsorted(ends, starts, side='right')
+        continued = np.all(vertices[ends[:-1]] == vertices[ends[:-1] - 1],
+                           axis=1)
+        streamline = np.concatenate(([0], np.cumsum(~continued)))[line]
+
+        # Subtract the distance travelled before each streamline started
+        is_first = np.concatenate(([True], streamline[1:] != streamline[:-1]))
+        line_start = before[is_first]
+        before = before - line_start[np.cumsum(is_first) - 1]
+        after = before + length
+        shift = (1 - offset) * spacing
+        chosen = np.flatnonzero(
+            np.floor((after + shift) / spacing) > np.floor(
+                (before + shift) / spacing))
+
+    x, y = vertices[starts[chosen]].T
+    dx, dy = step[chosen].T
+    return x, y, dx, dy
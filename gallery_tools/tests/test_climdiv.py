@@ -0,0 +1,88 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+import cartopy.crs as ccrs
+import matplotlib.colors as colors
+import matplotlib.pyplot as plt
+import numpy as np
+import xarray as xr
+
+from gallery_tools.climdiv import (annual_totals, classify,
+                                   division_collection, read_divisions,
+                                   save_yearly_maps)
+
+
+def _divisions(nyears):
+    """Two square climate divisions with monthly precipitation."""
+
+    data_vars = {}
+    for i, monthly in enumerate([1., 4.]):
+        lon = np.array([-100., -99., -99., -100., -100.]) + 2 * i
+        lat = np.array([40., 40., 41., 41., 40.])
+        # The second year is twice as wet as the first, and so on
+        values = monthly * np.repeat(np.arange(1, nyears + 1), 12)
+        data_vars[f'div{i}'] = xr.DataArray(values,
+                                            dims=['time'],
+                                            attrs={
+                                                'state_name': 'state',
+                                                'lon': lon,
+                                                'lat': lat
+                                            })
+    return xr.Dataset(data_vars)
+
+
+def test_annual_totals():
+    _, precipitation, _, _ = read_divisions(_divisions(2))
+    np.testing.assert_array_equal(annual_totals(precipitation),
+                                  [[12, 24], [48, 96]])
+
+
+def test_classify_matches_find_div_color():
+    colorbounds = [0, 5, 10, 100]
+    index = classify(np.array([-1, 0, 7, 99, 100, np.nan]), colorbounds)
+    np.testing.assert_array_equal(index, [2, 0, 1, 2, 2, 2])
+
+
+def test_save_yearly_maps(tmp_path):
+    _, precipitation, vertices, parts = read_divisions(_divisions(2))
+    totals = annual_totals(precipitation)
+    colormap = colors.ListedColormap(['blue', 'green', 'red'])
+    colorbounds = [0, 20, 50, 100]
+
+    fig = plt.figure()
+    ax = plt.axes(projection=ccrs.LambertConformal())
+    ax.set_extent([-105, -90, 35, 45], ccrs.PlateCarree())
+    collection = division_collection(vertices, parts, ax.projection)
+    ax.add_collection(collection, autolim=False)
+    label = ax.set_title('')
+
+    facecolors = []
+    savefig = fig.savefig
+
+    def recording_savefig(fname, **kwargs):
+        facecolors.append(collection.get_facecolor().copy())
+        assert ax.collections[-1] is collection
+        savefig(fname, **kwargs)
+
+    fig.savefig = recording_savefig
+    filenames = save_yearly_maps(fig,
+                                 collection,
+                                 totals,
+                                 colormap,
+                                 colorbounds,
+                                 str(tmp_path / 'maps' / 'polyg_2_{year}.png'),
+                                 first_year=1899,
+                                 label_artist=label)
+    plt.close(fig)
+
+    assert [f.rsplit('_', 1)[-1] for f in filenames] == ['1899.png',
+                                                          '1900.png']
+    assert all((tmp_path / 'maps' / name).exists()
+               for name in ['polyg_2_1899.png', 'polyg_2_1900.png'])
+    assert label.get_text() == '1900'
+    # 12 and 48 inches in 1899, 24 and 96 in 1900
+    np.testing.assert_array_equal(facecolors[0],
+                                  colormap([0, 1]))
+    np.testing.assert_array_equal(facecolors[1],
+                                  colormap([1, 2]))
@@ -0,0 +1,68 @@
+import cartopy.crs as ccrs
+import numpy as np
+import shapefile
+import shapely
+
+from gallery_tools.natural_earth import (_clip_boxes, _read_entry,
+                                         _same_dimension, _write_entry,
+                                         project_shapefile)
+
+
+def _write_polygons(path, boxes):
+    with shapefile.Writer(str(path), shapeType=shapefile.POLYGON) as writer:
+        writer.field('NAME', 'C')
+        for name, (x0, y0, x1, y1) in boxes.items():
+            # Clockwise outer ring, as shapefiles store them
+            writer.poly([[(x0, y0), (x0, y1), (x1, y1), (x1, y0), (x0, y0)]])
+            writer.record(name)
+
+
+def test_clip_to_degenerate_line(tmp_path):
+    proj = ccrs.PlateCarree()
+    extent = [0, 10, 0, 10]
+    clip, _ = _clip_boxes(proj, extent)
+    xmin, ymin, xmax, ymax = clip.bounds
+    # 'edge' only shares the right side of the clipping box, so clipping
+    # leaves a bare LineString of it
+    assert shapely.box(xmax, 2, xmax + 1, 4).intersection(
+        clip).geom_type == 'LineString'
+    _write_polygons(
+        tmp_path / 'boxes', {
+            'inside': (2, 2, 4, 4),
+            'edge': (xmax, 2, xmax + 1, 4),
+            'across': (8, 6, 12, 8),
+        })
+
+    geometries, records = project_shapefile(str(tmp_path / 'boxes.shp'),
+                                            proj,
+                                            extent,
+                                            fields=['NAME'])
+
+    assert [record['NAME'] for record in records] == ['inside', 'across']
+    assert all(shapely.get_dimensions(geom) == 2 for geom in geometries)
+    assert geometries[1].bounds == (8, 6, xmax, 8)
+
+    # The geometries can be stored and read back
+    _write_entry(str(tmp_path / 'entry'), geometries, records, {})
+    stored, stored_records = _read_entry(str(tmp_path / 'entry'))
+    assert stored_records == records
+    assert all(shapely.equals(stored, geometries))
+
+
+def test_same_dimension():
+    area = shapely.box(0, 0, 1, 1)
+    line = shapely.LineString([(0, 0), (1, 0)])
+    point = shapely.Point(0, 0)
+
+    assert _same_dimension(line, area).is_empty
+    assert _same_dimension(point, area).is_empty
+    assert _same_dimension(area, area).equals(area)
+
+    collection = shapely.GeometryCollection(
+        [area, line, point, shapely.MultiPolygon([shapely.box(2, 2, 3, 3)])])
+    kept = _same_dimension(collection, area)
+    assert kept.geom_type == 'MultiPolygon'
+    assert np.isclose(kept.area, 2)
+
+    lines = _same_dimension(shapely.GeometryCollection([line, point]), line)
+    assert lines.equals(line)
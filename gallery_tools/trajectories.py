@@ -0,0 +1,82 @@
+"""
+Batched rendering of trajectories, as in NCL_traj_1.
+
+Drawing every trajectory with its own ``plot`` call and every marker with
+its own ``scatter`` call creates one artist per line and per point, and
+matplotlib's per-artist overhead soon dominates. Here the tracks are taken
+as one (trajectory, time) array per coordinate: all of them are drawn as a
+single ``LineCollection``, and the markers on every n-th time step, found
+with strided slicing, as a single ``scatter`` per marker color. Markers of
+one color are drawn by matplotlib's fast path for uniform markers, which
+per-point colors would disable. This stays interactive for hundreds of
+thousands of trajectories.
+"""
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+
+def plot_trajectories(ax,
+                      lon,
+                      lat,
+                      colors='black',
+                      n=4,
+                      linewidth=0.4,
+                      marker_size=1,
+                      marker_color='black',
+                      start_color='green',
+                      zorder=2.5):
+    """
+    Utility function to draw many trajectories with markers on every n-th time step.
+
+    Args:
+        ax (:class:`matplotlib.axes._subplots.AxesSubplot` or :class:`cartopy.mpl.geoaxes.GeoAxesSubplot`):
+            Current axes to the current figure. For map axes, lon and lat are taken as data
+            coordinates, so they are in the coordinates of the map projection.
+        lon (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Longitudes with shape (trajectory, time).
+        lat (:class:`numpy.ndarray` or :class:`xarray.DataArray`):
+            Latitudes with shape (trajectory, time).
+        colors (:class:`str` or :class:`list`):
+            Color of all trajectory lines, or one color per trajectory. Default color is 'black'.
+        n (:class:`int`):
+            Put a marker on every n-th time step. Default n is 4.
+        linewidth (:class:`float`):
+            Width of the trajectory lines. Default linewidth is 0.4.
+        marker_size (:class:`float`):
+            Size of the markers, in points**2. Default marker_size is 1.
+        marker_color (:class:`str`):
+            Color of the markers on every n-th time step. Default color is 'black'.
+        start_color (:class:`str`):
+            Color of the marker on the first time step of every trajectory. Default color is 'green'.
+        zorder (:class:`float`):
+            Drawing order of the markers. Default zorder is 2.5.
+    Returns:
+        lines (:class:`matplotlib.collections.LineCollection`):
+            Collection with one line per trajectory.
+        markers (:class:`matplotlib.collections.PathCollection`):
+            Collection with the markers on every n-th time step.
+        starts (:class:`matplotlib.collections.PathCollection`):
+            Collection with the markers on the first time step.
+    """
+
+    # Shape (trajectory, time, 2), which LineCollection takes as it is
+    tracks = np.stack((np.asarray(lon), np.asarray(lat)), axis=-1)
+
+    lines = LineCollection(tracks, colors=colors, linewidths=linewidth)
+    ax.add_collection(lines, autolim=False)
+
+    # Every n-th time step after the first one, then the starting points so
+    # they are drawn on top
+    steps = tracks[:, n::n].reshape(-1, 2)
+    markers = ax.scatter(steps[:, 0],
+                         steps[:, 1],
+                         color=marker_color,
+                         s=marker_size,
+                         zorder=zorder)
+    starts = ax.scatter(tracks[:, 0, 0],
+                        tracks[:, 0, 1],
+                        color=start_color,
+                        s=marker_size,
+                        zorder=zorder)
+    return lines, markers, starts
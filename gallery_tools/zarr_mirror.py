@@ -0,0 +1,305 @@
+"""
+Chunked Zarr mirror of the ``geocat.datafiles`` netCDF inputs.
+
+The netCDF inputs are single files that xarray reads through the netCDF
+libraries, decompressing or copying whole variables to take one slice of
+them. This module converts every one of them into a compressed Zarr store
+whose chunks follow the way the examples slice the data, and can make
+``xarray.open_dataset`` read the stores instead: ``isel(time=0)`` or
+``isel(lev=...)`` then reads the chunks of one field and
+``sel(lat=60, lon=180)`` time series the chunks of one column, lazily and
+in parallel through dask.
+
+Chunks hold one horizontal field (the last two dimensions of a variable)
+per step of the other dimensions, which is how most examples slice their
+data. Files that are also read along other dimensions get their own layout
+in ACCESS_CHUNKS. The stores keep the variables as they are in the files,
+undecoded, so the decoding options the examples pass (ex.
+``decode_times=False``) apply to them exactly as to the netCDF files.
+
+Build or update the mirror of every input of the gallery with::
+
+    python -m gallery_tools.zarr_mirror --output DIR
+
+and read from it by building the gallery with ``GALLERY_ZARR_MIRROR=DIR``
+(the ``use_mirror`` hook in ``conf.py``). Inputs without an up-to-date
+store in the mirror are still read from the netCDF files.
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+INDEX_NAME = 'mirror.json'
+
+# Chunk sizes of the files that are not only read one horizontal field at a
+# time, by dimension. Dimensions left out use the default layout.
+ACCESS_CHUNKS = {
+    # Whole fields at one time step (NCL_dev_2) and time series at one
+    # point (NCL_scatter_4): a tile of the grid over ten years
+    'netcdf_files/b003_TS_200-299.nc': {
+        'time': 120,
+        'lat': 16,
+        'lon': 32
+    },
+}
+
+# Index of the mirror used by use_mirror in this process, path -> store
+_stores = None
+
+# xarray.open_dataset as it was before use_mirror replaced it
+_open_dataset = None
+
+
+def mirror_dir():
+    """Directory of the mirror, or None when it is not used."""
+
+    return os.environ.get('GALLERY_ZARR_MIRROR')
+
+
+def chunk_layout(ds, path=None):
+    """
+    Utility function to choose the chunks of every variable of a dataset.
+
+    Args:
+        ds (:class:`xarray.Dataset`):
+            Dataset to be stored.
+        path (:class:`str`):
+            Datafile path of the dataset (ex. 'netcdf_files/uv300.nc'), to look up in ACCESS_CHUNKS.
+    Returns:
+        chunks (:class:`dict`):
+            Chunk shape of every variable, by name. Variables with less than two dimensions are
+            stored as one chunk; others get one chunk per horizontal field.
+    """
+
+    access = ACCESS_CHUNKS.get(path, {})
+    chunks = {}
+    for name, variable in ds.variables.items():
+        horizontal = variable.dims[-2:] if variable.ndim >= 2 else variable.dims
+        chunks[name] = tuple(
+            max(1, min(access.get(dim, size if dim in horizontal else 1),
+                       size))
+            for dim, size in zip(variable.dims, variable.shape))
+    return chunks
+
+
+def convert(local, store, path=None):
+    """
+    Utility function to write a netCDF file as a Zarr store.
+
+    Args:
+        local (:class:`str`):
+            The netCDF file.
+        store (:class:`str`):
+            Directory of the Zarr store. It is replaced when it exists.
+        path (:class:`str`):
+            Datafile path of the file, see chunk_layout.
+    Returns:
+        chunks (:class:`dict`):
+            Chunk shape of every variable, by name.
+    """
+
+    import xarray as xr
+
+    root = os.path.dirname(store)
+    os.makedirs(root, exist_ok=True)
+    # Write next to the store and rename it, so readers never see a partial
+    # store
+    tmp = tempfile.mkdtemp(dir=root, suffix='.zarr')
+    try:
+        with xr.open_dataset(local, decode_cf=False) as ds:
+            for variable in ds.variables.values():
+                variable.encoding = {}
+            chunks = chunk_layout(ds, path)
+            ds.to_zarr(tmp,
+                       mode='w',
+                       consolidated=False,
+                       encoding={
+                           name: {
+                               'chunks': shape
+                           } for name, shape in chunks.items()
+                       })
+        if os.path.isdir(store):
+            shutil.rmtree(store)
+        os.replace(tmp, store)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return chunks
+
+
+def build(paths, output, jobs=None):
+    """
+    Utility function to bring the mirror of the given datafiles up to date.
+
+    Args:
+        paths (:class:`list`):
+            Datafile paths as passed to geocat.datafiles.get. Files that are not netCDF are skipped.
+        output (:class:`str`):
+            Directory of the mirror.
+        jobs (:class:`int`):
+            Number of files converted concurrently. Defaults to the number of CPUs.
+    Returns:
+        index (:class:`dict`):
+            The index of the mirror, mapping each mirrored path to its store, the size and
+            modification time of the file it was made from and its chunks.
+    """
+
+    import geocat.datafiles as gdf
+
+    index = _read_index(output)
+    pending = {}
+    for path in sorted(set(paths)):
+        local = gdf.get(path)
+        if not _is_netcdf(local):
+            continue
+        stat = os.stat(local)
+        entry = index.get(path)
+        if (entry is not None and entry['size'] == stat.st_size and
+                entry['mtime'] == stat.st_mtime and
+                os.path.isdir(os.path.join(output, entry['store']))):
+            continue
+        pending[path] = (local, stat)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            path: executor.submit(convert, local,
+                                  os.path.join(output, path + '.zarr'), path)
+            for path, (local, _) in pending.items()
+        }
+        for path, future in futures.items():
+            _, stat = pending[path]
+            index[path] = {
+                'store': path + '.zarr',
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'chunks': future.result(),
+            }
+
+    _write_index(output, index)
+    return index
+
+
+def open_dataset(filename_or_obj, *args, **kwargs):
+    """
+    Utility function to open a dataset from the mirror when it holds the file.
+
+    Args:
+        filename_or_obj (:class:`str`):
+            Path of the file, as passed to xarray.open_dataset.
+        args, kwargs:
+            Passed on to xarray.open_dataset (ex. decode_times=False).
+    Returns:
+        ds (:class:`xarray.Dataset`):
+            Dataset read lazily from the Zarr store with dask, or from the file itself when the mirror
+            has no up-to-date store of it.
+    """
+
+    import xarray as xr
+
+    xr_open_dataset = _open_dataset or xr.open_dataset
+    store = None
+    if not args and isinstance(filename_or_obj, (str, os.PathLike)):
+        store = (_stores or {}).get(os.path.realpath(filename_or_obj))
+    if store is None:
+        return xr_open_dataset(filename_or_obj, *args, **kwargs)
+
+    kwargs.pop('engine', None)
+    kwargs.setdefault('chunks', {})
+    return xr_open_dataset(store,
+                           engine='zarr',
+                           consolidated=False,
+                           **kwargs)
+
+
+def use_mirror(gallery_conf, fname):
+    """
+    sphinx-gallery ``reset_modules`` hook making ``xarray.open_dataset``
+    read from the mirror named by ``GALLERY_ZARR_MIRROR``. It is installed
+    once per process and does nothing when the variable is not set.
+    """
+
+    global _stores, _open_dataset
+    if _open_dataset is not None or not mirror_dir():
+        return
+
+    import geocat.datafiles as gdf
+    import xarray as xr
+
+    output = mirror_dir()
+    _stores = {}
+    for path, entry in _read_index(output).items():
+        local = os.path.realpath(os.path.join(gdf.POOCH.abspath, path))
+        try:
+            stat = os.stat(local)
+        except OSError:
+            continue
+        if stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+            _stores[local] = os.path.join(output, entry['store'])
+
+    _open_dataset = xr.open_dataset
+    xr.open_dataset = open_dataset
+
+
+def _is_netcdf(local):
+    """Whether a file is netCDF, classic (CDF) or netCDF-4 (HDF5)."""
+
+    with open(local, 'rb') as f:
+        magic = f.read(8)
+    return magic[:3] == b'CDF' or magic == b'\x89HDF\r\n\x1a\n'
+
+
+def _read_index(output):
+    try:
+        with open(os.path.join(output, INDEX_NAME)) as f:
+            return json.load(f)['files']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _write_index(output, files):
+    os.makedirs(output, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'files': files}, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(output, INDEX_NAME))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'python -m {__spec__.name}',
+        description='Build or update the Zarr mirror of the netCDF inputs '
+        'of the gallery.')
+    parser.add_argument('paths',
+                        nargs='*',
+                        metavar='PATH',
+                        help='datafile paths to mirror (default: every input '
+                        'of the examples under Plots)')
+    parser.add_argument('--output',
+                        default=mirror_dir(),
+                        help='directory of the mirror (default: '
+                        '$GALLERY_ZARR_MIRROR)')
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args(argv)
+    if not args.output:
+        parser.error('--output is required when GALLERY_ZARR_MIRROR is unset')
+
+    paths = args.paths
+    if not paths:
+        from .datafiles import scan
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        paths = scan(
+            glob.glob(os.path.join(root, 'Plots', '**', '*.py'),
+                      recursive=True))
+
+    index = build(paths, args.output, jobs=args.jobs)
+    print(f'{len(index)} netCDF files mirrored in {args.output}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())